@@ -0,0 +1,104 @@
+
+import os
+import json
+import pytest
+from dotenv import load_dotenv
+
+# src/ is on the import path via pythonpath in pytest.ini
+from xero_api import get_access_token, get_tenant_id, get_http_session
+
+load_dotenv()
+
+
+@pytest.fixture(scope="session")
+def xero_credentials():
+    """Client ID and secret from the environment; skips Xero tests when missing."""
+    client_id = os.getenv('XERO_CLIENT_ID')
+    client_secret = os.getenv('XERO_CLIENT_SECRET')
+    if not client_id or not client_secret:
+        pytest.skip("XERO_CLIENT_ID / XERO_CLIENT_SECRET not set")
+    return client_id, client_secret
+
+
+@pytest.fixture(scope="session")
+def xero_session():
+    """Shared pooled session for all Xero calls in the test run."""
+    return get_http_session()
+
+
+@pytest.fixture(scope="session")
+def xero_token(xero_credentials):
+    """Access token, fetched (or read from the token cache) once per test run."""
+    return get_access_token()
+
+
+@pytest.fixture(scope="session")
+def xero_tenant_id(xero_credentials):
+    """Tenant ID the token was issued against."""
+    return get_tenant_id()
+
+
+@pytest.fixture(scope="session")
+def xero_headers(xero_token, xero_tenant_id):
+    """Standard JSON headers for Xero accounting API calls."""
+    return {
+        'Authorization': f'Bearer {xero_token}',
+        'Xero-Tenant-Id': xero_tenant_id,
+        'Content-Type': 'application/json',
+        'Accept': 'application/json'
+    }
+
+
+@pytest.fixture
+def xero_writes():
+    """Tests that create real contacts in Xero only run when XERO_ALLOW_WRITES=1."""
+    if os.getenv('XERO_ALLOW_WRITES') != '1':
+        pytest.skip("creates contacts in Xero; set XERO_ALLOW_WRITES=1 to run")
+
+
+class StubResponse:
+    """Minimal stand-in for requests.Response, built from a status, JSON body and headers."""
+
+    def __init__(self, status_code, body=None, headers=None, url='https://api.xero.com/api.xro/2.0/'):
+        self.status_code = status_code
+        self.content = json.dumps(body).encode() if body is not None else b''
+        self.text = self.content.decode()
+        self.headers = headers or {}
+        self.url = url
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class StubSession:
+    """Offline session that replays queued responses and records each call."""
+
+    def __init__(self):
+        self.responses = []
+        self.calls = []
+
+    def respond(self, status_code, body=None, headers=None):
+        """Queue the response for the next request."""
+        self.responses.append(StubResponse(status_code, body, headers))
+
+    def _next(self, method, url, kwargs):
+        self.calls.append((method, url, kwargs))
+        return self.responses.pop(0)
+
+    def get(self, url, **kwargs):
+        return self._next('GET', url, kwargs)
+
+    def post(self, url, **kwargs):
+        return self._next('POST', url, kwargs)
+
+
+@pytest.fixture
+def stub_session():
+    """Session stub for offline tests; queue responses with respond()."""
+    return StubSession()
+
+
+@pytest.fixture
+def stub_response():
+    """Build a standalone StubResponse (for response hooks)."""
+    return StubResponse
@@ -195,6 +195,9 @@ QUARTERLY_MONTHS = [1, 4, 7, 10]  # January, April, July, October
 
 ACCOUNT_NUMBER_PATTERN = r'^([A-Z]{3}\d{5})(\d)(/[A-Z0-9]+)$'
 
+# Compiled once; account numbers are parsed on every search and contact creation
+ACCOUNT_NUMBER_RE = re.compile(ACCOUNT_NUMBER_PATTERN)
+
 # ============================================================================
 # UTILITY FUNCTIONS
 # ============================================================================
@@ -212,7 +215,7 @@ def parse_account_number(account_number: str) -> Optional[Tuple[str, str, str]]:
     Example:
         parse_account_number("ANP001042/3B") -> ("ANP00104", "2", "/3B")
     """
-    match = re.match(ACCOUNT_NUMBER_PATTERN, account_number)
+    match = ACCOUNT_NUMBER_RE.match(account_number)
     if match:
         base_code = match.group(1)  # First 8 characters (ANP00104)
         sequence_digit = match.group(2)  # 9th character (2)
@@ -279,7 +282,7 @@ def validate_account_number(account_number: str) -> bool:
     Returns:
         bool: True if valid format, False otherwise
     """
-    return parse_account_number(account_number) is not None
+    return ACCOUNT_NUMBER_RE.match(account_number) is not None
 
 def validate_contact_code(contact_code: str) -> bool:
     """
@@ -25,6 +25,10 @@ from constants import (
     validate_contact_code,
     CONTACT_CODES
 )
+from xero_api import (
+    dump_json, get_http_session, get_json,
+    load_cached_token, save_cached_token, with_idempotency_key
+)
 
 # Load environment variables - look in parent directory if not found
 load_dotenv()
@@ -37,8 +41,13 @@ if not os.getenv('XERO_CLIENT_ID'):
 class XeroContactManager:
     """Main class for managing Xero contacts and property account creation."""
     
-    def __init__(self):
-        """Initialize the Xero Contact Manager with API credentials."""
+    def __init__(self, session: Optional[requests.Session] = None, token_cache: bool = False):
+        """
+        Initialize the Xero Contact Manager with API credentials and a pooled HTTP session.
+        
+        The on-disk token cache is opt-in (token_cache=True) since it stores the
+        bearer token in plaintext under the user's home directory.
+        """
         self.client_id = os.getenv('XERO_CLIENT_ID')
         self.client_secret = os.getenv('XERO_CLIENT_SECRET')
         
@@ -48,21 +57,52 @@ class XeroContactManager:
         self.access_token = None
         self.tenant_id = None
         self.base_url = "https://api.xero.com/api.xro/2.0"
+        self.session = session or get_http_session()
+        self.scope = 'accounting.contacts accounting.transactions'  # Both contacts and invoices
+        self.token_cache = token_cache
+    
+    def load_cached_token(self, min_lifetime: float = 0) -> bool:
+        """
+        Reuse a still-valid access token from the on-disk token cache.
         
-    def authenticate(self) -> bool:
+        Args:
+            min_lifetime (float): Seconds the cached token must remain valid for
+            
+        Returns:
+            bool: True if a cached token and tenant were loaded
+        """
+        if not self.token_cache:
+            return False
+        
+        cached = load_cached_token(self.client_id, self.scope, min_lifetime)
+        if not cached:
+            return False
+        
+        self.access_token = cached['access_token']
+        self.tenant_id = cached['tenant_id']
+        print("Using cached Xero access token")
+        return True
+        
+    def authenticate(self, min_lifetime: float = 0) -> bool:
         """
         Authenticate with Xero API using Client Credentials (for Custom Connection apps).
         
+        Args:
+            min_lifetime (float): Only reuse a cached token valid for at least this many more seconds
+            
         Returns:
             bool: True if authentication successful, False otherwise
         """
+        if self.load_cached_token(min_lifetime):
+            return True
+        
         try:
             print("Authenticating with Xero using Client Credentials...")
             
             # Client credentials flow for custom connections
             token_data = {
                 'grant_type': 'client_credentials',
-                'scope': 'accounting.contacts accounting.transactions'  # Updated scope for both contacts and invoices
+                'scope': self.scope
             }
             
             # Use basic auth for client credentials
@@ -73,7 +113,7 @@ class XeroContactManager:
                 'Content-Type': 'application/x-www-form-urlencoded'
             }
             
-            response = requests.post(
+            response = self.session.post(
                 'https://identity.xero.com/connect/token',
                 data=token_data,
                 headers=headers
@@ -85,7 +125,13 @@ class XeroContactManager:
                 print("Authentication successful!")
                 
                 # Get tenant information
-                return self._get_tenant_info()
+                if not self._get_tenant_info():
+                    return False
+                
+                if self.token_cache:
+                    save_cached_token(self.client_id, self.scope, self.access_token,
+                                      self.tenant_id, token_info.get('expires_in', 1800))
+                return True
             else:
                 print(f"Authentication failed: {response.status_code} - {response.text}")
                 return False
@@ -110,7 +156,7 @@ class XeroContactManager:
             }
             
             # Method 1: Try the connections endpoint
-            response = requests.get(
+            response = self.session.get(
                 'https://api.xero.com/connections',
                 headers=headers
             )
@@ -129,7 +175,7 @@ class XeroContactManager:
             
             # For custom connections, we might need to extract tenant from the JWT token
             # or try the organisations endpoint without tenant-id header first
-            org_response = requests.get(
+            org_response = self.session.get(
                 f'{self.base_url}/Organisations',
                 headers={
                     'Authorization': f'Bearer {self.access_token}',
@@ -183,13 +229,13 @@ class XeroContactManager:
                 print(f"Searching for latest contact at property: {account_number}")
                 
                 # Get all contacts and filter by property base
-                response = requests.get(
+                status_code, data, error_text = get_json(
+                    self.session,
                     f'{self.base_url}/Contacts',
-                    headers=headers
+                    headers
                 )
                 
-                if response.status_code == 200:
-                    data = response.json()
+                if status_code == 200:
                     all_contacts = data.get('Contacts', [])
                     
                     # Filter contacts that start with the property base
@@ -209,7 +255,7 @@ class XeroContactManager:
                         print(f"No contacts found for property base: {account_number}")
                         return None
                 else:
-                    print(f"Error getting contacts: {response.status_code} - {response.text}")
+                    print(f"Error getting contacts: {status_code} - {error_text}")
                     return None
             
             else:
@@ -224,14 +270,14 @@ class XeroContactManager:
                     'where': f'AccountNumber=="{account_number}"'
                 }
                 
-                response = requests.get(
+                status_code, data, error_text = get_json(
+                    self.session,
                     f'{self.base_url}/Contacts',
-                    headers=headers,
-                    params=params
+                    headers,
+                    params
                 )
                 
-                if response.status_code == 200:
-                    data = response.json()
+                if status_code == 200:
                     contacts = data.get('Contacts', [])
                     
                     if contacts:
@@ -241,7 +287,7 @@ class XeroContactManager:
                         print(f"No contact found with account number: {account_number}")
                         return None
                 else:
-                    print(f"Error searching for contact: {response.status_code} - {response.text}")
+                    print(f"Error searching for contact: {status_code} - {error_text}")
                     return None
                     
         except Exception as e:
@@ -271,7 +317,7 @@ class XeroContactManager:
             print(f"Searching for contact group starting with: {prefix}")
             
             # Get all contact groups
-            response = requests.get(
+            response = self.session.get(
                 f'{self.base_url}/ContactGroups',
                 headers=headers
             )
@@ -328,10 +374,10 @@ class XeroContactManager:
             
             print(f"Adding contact {contact_id} to group {group_id}")
             
-            response = requests.put(
+            response = self.session.put(
                 f'{self.base_url}/ContactGroups/{group_id}/Contacts',
                 headers=headers,
-                json=payload
+                data=dump_json(payload)
             )
             
             if response.status_code == 200:
@@ -371,7 +417,7 @@ class XeroContactManager:
                 'where': f'AccountNumber=="{account_number}"'
             }
             
-            response = requests.get(
+            response = self.session.get(
                 f'{self.base_url}/Contacts',
                 headers=headers,
                 params=params
@@ -528,7 +574,8 @@ class XeroContactManager:
                 'options': []
             }
 
-    def create_new_contact(self, existing_contact: Dict[str, Any], new_contact_data: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    def create_new_contact(self, existing_contact: Dict[str, Any], new_contact_data: Dict[str, str],
+                           overrides: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
         """
         Create a new contact based on an existing contact with modifications.
         
@@ -539,11 +586,15 @@ class XeroContactManager:
                 - first_name: New contact's first name (required)
                 - last_name: New contact's last name (optional)
                 - email: New contact's email (optional)
+            overrides (dict): Optional fields that replace those in new_contact_data
                 
         Returns:
             dict: Created contact data if successful, None otherwise
         """
         try:
+            if overrides:
+                new_contact_data = {**new_contact_data, **overrides}
+            
             # Validate new contact data
             if not new_contact_data.get('first_name'):
                 print("First name is required")
@@ -732,10 +783,10 @@ class XeroContactManager:
             print(f"Payload: {json.dumps(payload, indent=2)}")
             
             print("Making POST request to Xero...")
-            response = requests.post(
+            response = self.session.post(
                 f'{self.base_url}/Contacts',
-                headers=headers,
-                json=payload
+                headers=with_idempotency_key(headers),
+                data=dump_json(payload)
             )
             
             print(f"=== RESPONSE RECEIVED ===")
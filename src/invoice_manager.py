@@ -12,11 +12,14 @@ UPDATED: Now includes repeating invoice template reassignment functionality.
 import os
 import json
 import base64
-from typing import Dict, Optional, Any, List, Tuple
+from typing import Dict, Optional, Any, List, Tuple, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, date
 from dotenv import load_dotenv
 import requests
 
+from xero_api import MAX_CONCURRENT_CALLS, dump_json, get_http_session, get_json
+
 # Load environment variables
 load_dotenv()
 if not os.getenv('XERO_CLIENT_ID'):
@@ -28,13 +31,15 @@ if not os.getenv('XERO_CLIENT_ID'):
 class XeroInvoiceManager:
     """Main class for managing Xero invoice reassignment operations."""
     
-    def __init__(self, access_token: str = None, tenant_id: str = None):
+    def __init__(self, access_token: str = None, tenant_id: str = None,
+                 session: Optional[requests.Session] = None):
         """
         Initialize the Xero Invoice Manager.
         
         Args:
             access_token (str, optional): Existing access token
             tenant_id (str, optional): Existing tenant ID
+            session (requests.Session, optional): HTTP session; defaults to the shared pool
         """
         self.client_id = os.getenv('XERO_CLIENT_ID')
         self.client_secret = os.getenv('XERO_CLIENT_SECRET')
@@ -45,6 +50,7 @@ class XeroInvoiceManager:
         self.access_token = access_token
         self.tenant_id = tenant_id
         self.base_url = "https://api.xero.com/api.xro/2.0"
+        self.session = session or get_http_session()
         
         # If no token provided, we'll need to authenticate
         if not self.access_token:
@@ -72,7 +78,7 @@ class XeroInvoiceManager:
                 'Content-Type': 'application/x-www-form-urlencoded'
             }
             
-            response = requests.post(
+            response = self.session.post(
                 'https://identity.xero.com/connect/token',
                 data=token_data,
                 headers=headers
@@ -100,7 +106,7 @@ class XeroInvoiceManager:
                 'Accept': 'application/json'
             }
             
-            response = requests.get(
+            response = self.session.get(
                 'https://api.xero.com/connections',
                 headers=headers
             )
@@ -113,7 +119,7 @@ class XeroInvoiceManager:
                     return True
             
             # Fallback method
-            org_response = requests.get(
+            org_response = self.session.get(
                 f'{self.base_url}/Organisations',
                 headers={
                     'Authorization': f'Bearer {self.access_token}',
@@ -136,91 +142,138 @@ class XeroInvoiceManager:
             print(f"Error getting tenant info for invoices: {str(e)}")
             return False
     
-    def search_invoices_by_contact_and_date(self, contact_id: str, move_in_date: date) -> List[Dict[str, Any]]:
+    def iter_invoice_pages(self, contact_id: str, move_in_date: date,
+                           pagesize: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield a contact's invoices page by page, newest first.
+        
+        Paging stops at the first short page, or once a page reaches back past
+        the move-in date (later pages can only be older). Lets callers show
+        results as soon as the first page arrives.
+        
+        Args:
+            contact_id (str): ContactID to search for
+            move_in_date (date): Date when new occupier moved in
+            pagesize (int): Invoices per page (Xero allows up to 1000)
+            
+        Yields:
+            list: Raw invoice dictionaries for one page (unfiltered by date)
+            
+        Raises:
+            RuntimeError: If Xero returns a non-200 response
+        """
+        headers = {
+            'Authorization': f'Bearer {self.access_token}',
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        }
+        
+        if self.tenant_id and self.tenant_id != "custom_connection":
+            headers['Xero-Tenant-Id'] = self.tenant_id
+        
+        page = 1
+        
+        while True:
+            # summaryOnly drops line items, history and attachments; the
+            # list only needs ID, number, date, total and status
+            params = {
+                'ContactIDs': contact_id,
+                'order': 'Date DESC',
+                'page': page,
+                'pageSize': pagesize,
+                'summaryOnly': 'true'
+            }
+            
+            print(f"API Query: {params}")
+            
+            status_code, data, error_text = get_json(
+                self.session,
+                f'{self.base_url}/Invoices',
+                headers,
+                params
+            )
+            
+            if status_code != 200:
+                raise RuntimeError(f"{status_code} - {error_text}")
+            
+            page_invoices = data.get('Invoices', [])
+            yield page_invoices
+            
+            if len(page_invoices) < pagesize:
+                return
+            
+            oldest_str = page_invoices[-1].get('DateString', '')
+            if oldest_str and datetime.fromisoformat(oldest_str.replace('T00:00:00', '')).date() < move_in_date:
+                return
+            
+            page += 1
+    
+    def search_invoices_by_contact_and_date(self, contact_id: str, move_in_date: date,
+                                            pagesize: int = 1000,
+                                            raise_errors: bool = False) -> List[Dict[str, Any]]:
         """
         Search for invoices assigned to a contact issued after a specific date.
         
         Args:
             contact_id (str): ContactID to search for
             move_in_date (date): Date when new occupier moved in
+            pagesize (int): Invoices per page (Xero allows up to 1000)
+            raise_errors (bool): Re-raise failures instead of returning an empty list
             
         Returns:
             list: List of invoice dictionaries
         """
         try:
-            headers = {
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/json',
-                'Accept': 'application/json'
-            }
-            
-            if self.tenant_id and self.tenant_id != "custom_connection":
-                headers['Xero-Tenant-Id'] = self.tenant_id
-            
             # Format date for Xero API (YYYY-MM-DD)
             date_str = move_in_date.strftime('%Y-%m-%d')
             print(f"Searching for invoices to contact {contact_id} issued after {date_str}")
             
             # Build query parameters - NO STATUS FILTERING, NO WHERE CLAUSE
-            # Just get ALL invoices for this contact
-            params = {
-                'ContactIDs': contact_id,
-                'order': 'Date DESC'
-            }
+            # Just get ALL invoices for this contact, one page at a time
+            all_invoices = []
+            for page_invoices in self.iter_invoice_pages(contact_id, move_in_date, pagesize):
+                all_invoices.extend(page_invoices)
+            
+            print(f"Total invoices returned from API: {len(all_invoices)}")
+            
+            # Manual date filtering after getting all invoices
+            filtered_invoices = []
+            
+            for invoice in all_invoices:
+                invoice_date_str = invoice.get('DateString', '')
+                if invoice_date_str:
+                    try:
+                        # Parse the invoice date
+                        invoice_date = datetime.fromisoformat(invoice_date_str.replace('T00:00:00', '')).date()
+                        
+                        # Check if invoice is after move-in date
+                        if invoice_date >= move_in_date:
+                            filtered_invoices.append(invoice)
+                            print(f"✅ INCLUDED: {invoice.get('InvoiceNumber', 'N/A')} "
+                                  f"Date: {invoice_date} "
+                                  f"Status: {invoice.get('Status', 'N/A')} "
+                                  f"Amount: ${invoice.get('Total', 0)}")
+                        else:
+                            print(f"❌ EXCLUDED (too old): {invoice.get('InvoiceNumber', 'N/A')} "
+                                  f"Date: {invoice_date} "
+                                  f"Status: {invoice.get('Status', 'N/A')}")
+                    except Exception as e:
+                        print(f"⚠️ Error parsing date for invoice {invoice.get('InvoiceNumber', 'N/A')}: {e}")
+                else:
+                    print(f"⚠️ No date found for invoice {invoice.get('InvoiceNumber', 'N/A')}")
             
-            print(f"API Query: {params}")
+            # Log all unique statuses found
+            all_statuses = set(invoice.get('Status', 'UNKNOWN') for invoice in all_invoices)
+            print(f"All status codes found: {sorted(all_statuses)}")
             
-            response = requests.get(
-                f'{self.base_url}/Invoices',
-                headers=headers,
-                params=params
-            )
+            print(f"Final result: {len(filtered_invoices)} invoices after {move_in_date}")
+            
+            return filtered_invoices
             
-            if response.status_code == 200:
-                data = response.json()
-                all_invoices = data.get('Invoices', [])
-                
-                print(f"Total invoices returned from API: {len(all_invoices)}")
-                
-                # Manual date filtering after getting all invoices
-                filtered_invoices = []
-                
-                for invoice in all_invoices:
-                    invoice_date_str = invoice.get('DateString', '')
-                    if invoice_date_str:
-                        try:
-                            # Parse the invoice date
-                            invoice_date = datetime.fromisoformat(invoice_date_str.replace('T00:00:00', '')).date()
-                            
-                            # Check if invoice is after move-in date
-                            if invoice_date >= move_in_date:
-                                filtered_invoices.append(invoice)
-                                print(f"✅ INCLUDED: {invoice.get('InvoiceNumber', 'N/A')} "
-                                      f"Date: {invoice_date} "
-                                      f"Status: {invoice.get('Status', 'N/A')} "
-                                      f"Amount: ${invoice.get('Total', 0)}")
-                            else:
-                                print(f"❌ EXCLUDED (too old): {invoice.get('InvoiceNumber', 'N/A')} "
-                                      f"Date: {invoice_date} "
-                                      f"Status: {invoice.get('Status', 'N/A')}")
-                        except Exception as e:
-                            print(f"⚠️ Error parsing date for invoice {invoice.get('InvoiceNumber', 'N/A')}: {e}")
-                    else:
-                        print(f"⚠️ No date found for invoice {invoice.get('InvoiceNumber', 'N/A')}")
-                
-                # Log all unique statuses found
-                all_statuses = set(invoice.get('Status', 'UNKNOWN') for invoice in all_invoices)
-                print(f"All status codes found: {sorted(all_statuses)}")
-                
-                print(f"Final result: {len(filtered_invoices)} invoices after {move_in_date}")
-                
-                return filtered_invoices
-            else:
-                print(f"Error searching invoices: {response.status_code} - {response.text}")
-                return []
-                
         except Exception as e:
             print(f"Error searching for invoices: {str(e)}")
+            if raise_errors:
+                raise
             return []
     
     def get_invoice_details(self, invoice_id: str) -> Optional[Dict[str, Any]]:
@@ -243,7 +296,7 @@ class XeroInvoiceManager:
             if self.tenant_id and self.tenant_id != "custom_connection":
                 headers['Xero-Tenant-Id'] = self.tenant_id
             
-            response = requests.get(
+            response = self.session.get(
                 f'{self.base_url}/Invoices/{invoice_id}',
                 headers=headers
             )
@@ -260,16 +313,19 @@ class XeroInvoiceManager:
             print(f"Error getting invoice details: {str(e)}")
             return None
     
-    def reassign_invoice_to_contact(self, invoice_id: str, new_contact_id: str) -> bool:
+    def reassign_invoice_batch(self, invoice_ids: List[str], new_contact_id: str) -> Tuple[List[str], List[str]]:
         """
-        Reassign an invoice to a different contact.
+        Reassign a batch of invoices to a different contact in a single request.
+        
+        Uses summarizeErrors=false so one bad invoice doesn't fail the whole
+        batch; per-invoice ValidationErrors mark individual failures.
         
         Args:
-            invoice_id (str): InvoiceID to update
+            invoice_ids (list): InvoiceIDs to update (keep to ~100 per call)
             new_contact_id (str): ContactID of new contact
             
         Returns:
-            bool: True if successful, False otherwise
+            tuple: (successful_ids, failed_ids)
         """
         try:
             headers = {
@@ -281,56 +337,103 @@ class XeroInvoiceManager:
             if self.tenant_id and self.tenant_id != "custom_connection":
                 headers['Xero-Tenant-Id'] = self.tenant_id
             
-            # Prepare the update payload
             payload = {
-                'InvoiceID': invoice_id,
-                'Contact': {
-                    'ContactID': new_contact_id
-                }
+                'Invoices': [
+                    {'InvoiceID': invoice_id, 'Contact': {'ContactID': new_contact_id}}
+                    for invoice_id in invoice_ids
+                ]
             }
             
-            print(f"Reassigning invoice {invoice_id} to contact {new_contact_id}")
+            print(f"Reassigning batch of {len(invoice_ids)} invoices to contact {new_contact_id}")
             
-            response = requests.post(
-                f'{self.base_url}/Invoices/{invoice_id}',
+            response = self.session.post(
+                f'{self.base_url}/Invoices',
                 headers=headers,
-                json=payload
+                params={'summarizeErrors': 'false'},
+                data=dump_json(payload)
             )
             
-            if response.status_code == 200:
-                print(f"✅ Successfully reassigned invoice {invoice_id}")
-                return True
-            else:
-                print(f"❌ Error reassigning invoice: {response.status_code} - {response.text}")
-                return False
-                
+            if response.status_code != 200:
+                print(f"❌ Error reassigning invoice batch: {response.status_code} - {response.text}")
+                return [], list(invoice_ids)
+            
+            successful = []
+            failed = []
+            for invoice in response.json().get('Invoices', []):
+                invoice_id = invoice.get('InvoiceID')
+                errors = invoice.get('ValidationErrors') or []
+                if errors or invoice.get('StatusAttributeString') == 'ERROR':
+                    messages = '; '.join(e.get('Message', '') for e in errors)
+                    print(f"❌ Invoice {invoice_id} not reassigned: {messages}")
+                    failed.append(invoice_id)
+                else:
+                    successful.append(invoice_id)
+            
+            # Anything Xero didn't echo back is treated as failed
+            returned = set(successful) | set(failed)
+            failed.extend(invoice_id for invoice_id in invoice_ids if invoice_id not in returned)
+            
+            return successful, failed
+            
         except Exception as e:
-            print(f"❌ Error reassigning invoice: {str(e)}")
-            return False
+            print(f"❌ Error reassigning invoice batch: {str(e)}")
+            return [], list(invoice_ids)
     
-    def reassign_multiple_invoices(self, invoice_ids: List[str], new_contact_id: str) -> Tuple[List[str], List[str]]:
+    def reassign_multiple_invoices(self, invoice_ids: List[str], new_contact_id: str,
+                                   max_workers: int = MAX_CONCURRENT_CALLS, batch_size: int = 100,
+                                   progress_callback: Optional[Callable[[int, int], None]] = None) -> Tuple[List[str], List[str]]:
         """
         Reassign multiple invoices to a new contact.
         
+        Invoices are sent in batches of batch_size per POST, and the batches
+        go through a small thread pool rather than one after another.
+        
         Args:
             invoice_ids (list): List of InvoiceIDs to reassign
             new_contact_id (str): ContactID of new contact
+            max_workers (int): Maximum number of concurrent requests (capped at Xero's 5)
+            batch_size (int): Maximum invoices per request
+            progress_callback (callable, optional): Called as (completed, total)
+                from the calling thread after each batch finishes
             
         Returns:
             tuple: (successful_ids, failed_ids)
         """
         successful = []
         failed = []
+        total = len(invoice_ids)
         
-        print(f"\n🔄 Starting reassignment of {len(invoice_ids)} invoices...")
+        print(f"\n🔄 Starting reassignment of {total} invoices...")
         
-        for i, invoice_id in enumerate(invoice_ids, 1):
-            print(f"Processing invoice {i}/{len(invoice_ids)}: {invoice_id}")
+        if not invoice_ids:
+            return successful, failed
+        
+        batches = [invoice_ids[i:i + batch_size] for i in range(0, total, batch_size)]
+        completed = 0
+        
+        workers = min(max_workers, MAX_CONCURRENT_CALLS, len(batches))
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {
+                executor.submit(self.reassign_invoice_batch, batch, new_contact_id): batch
+                for batch in batches
+            }
             
-            if self.reassign_invoice_to_contact(invoice_id, new_contact_id):
-                successful.append(invoice_id)
-            else:
-                failed.append(invoice_id)
+            for future in as_completed(futures):
+                batch = futures[future]
+                
+                try:
+                    batch_ok, batch_failed = future.result()
+                except Exception as e:
+                    print(f"❌ Error reassigning invoice batch: {str(e)}")
+                    batch_ok, batch_failed = [], list(batch)
+                
+                successful.extend(batch_ok)
+                failed.extend(batch_failed)
+                completed += len(batch)
+                print(f"Processed {completed}/{total} invoices")
+                
+                if progress_callback:
+                    progress_callback(completed, total)
         
         print(f"\n📊 Reassignment Summary:")
         print(f"✅ Successful: {len(successful)}")
@@ -397,12 +500,14 @@ class XeroInvoiceManager:
                 'type': 'N/A'
             }
     
-    def search_repeating_invoices_by_contact(self, contact_id: str) -> List[Dict[str, Any]]:
+    def search_repeating_invoices_by_contact(self, contact_id: str,
+                                             raise_errors: bool = False) -> List[Dict[str, Any]]:
         """
         Search for repeating invoice templates assigned to a contact.
         
         Args:
             contact_id (str): ContactID to search for
+            raise_errors (bool): Raise on failure instead of returning an empty list
             
         Returns:
             list: List of repeating invoice templates
@@ -420,7 +525,7 @@ class XeroInvoiceManager:
             print(f"Searching for repeating invoices for contact {contact_id}")
             
             # Get all repeating invoices and filter by contact
-            response = requests.get(
+            response = self.session.get(
                 f'{self.base_url}/RepeatingInvoices',
                 headers=headers
             )
@@ -447,10 +552,14 @@ class XeroInvoiceManager:
                 return contact_templates
             else:
                 print(f"Error searching repeating invoices: {response.status_code} - {response.text}")
+                if raise_errors:
+                    raise RuntimeError(f"{response.status_code} - {response.text}")
                 return []
                 
         except Exception as e:
             print(f"Error searching for repeating invoices: {str(e)}")
+            if raise_errors:
+                raise
             return []
     
     def delete_repeating_invoice_template(self, template_id: str) -> bool:
@@ -481,10 +590,10 @@ class XeroInvoiceManager:
             
             print(f"Deleting repeating invoice template {template_id}")
             
-            response = requests.post(
+            response = self.session.post(
                 f'{self.base_url}/RepeatingInvoices/{template_id}',
                 headers=headers,
-                json=payload
+                data=dump_json(payload)
             )
             
             if response.status_code == 200:
@@ -587,7 +696,7 @@ class XeroInvoiceManager:
             # Handle ApprovedForSending and Status based on whether new contact has email
             try:
                 # Get new contact details to check for email address
-                contact_response = requests.get(
+                contact_response = self.session.get(
                     f'{self.base_url}/Contacts/{new_contact_id}',
                     headers=headers
                 )
@@ -629,10 +738,10 @@ class XeroInvoiceManager:
             print(f"Creating new repeating invoice template for contact {new_contact_id}")
             print(f"Template data: {json.dumps(new_template, indent=2)}")
             
-            response = requests.post(
+            response = self.session.post(
                 f'{self.base_url}/RepeatingInvoices',
                 headers=headers,
-                json=new_template
+                data=dump_json(new_template)
             )
             
             if response.status_code == 200:
@@ -784,7 +893,9 @@ class XeroInvoiceManager:
 
 # Standalone functions for integration with existing workflow
 def search_invoices_for_reassignment(contact_id: str, move_in_date: date, 
-                                   access_token: str = None, tenant_id: str = None) -> List[Dict[str, Any]]:
+                                   access_token: str = None, tenant_id: str = None,
+                                   pagesize: int = 1000,
+                                   raise_errors: bool = False) -> List[Dict[str, Any]]:
     """
     Standalone function to search for invoices that need reassignment.
     
@@ -793,20 +904,26 @@ def search_invoices_for_reassignment(contact_id: str, move_in_date: date,
         move_in_date (date): Date when new occupier moved in
         access_token (str, optional): Existing access token
         tenant_id (str, optional): Existing tenant ID
+        pagesize (int): Invoices per page (Xero allows up to 1000)
+        raise_errors (bool): Raise on failure so callers can tell it apart from "no invoices"
         
     Returns:
         list: List of invoices available for reassignment
     """
     try:
         manager = XeroInvoiceManager(access_token, tenant_id)
-        return manager.search_invoices_by_contact_and_date(contact_id, move_in_date)
+        return manager.search_invoices_by_contact_and_date(contact_id, move_in_date, pagesize,
+                                                           raise_errors=raise_errors)
     except Exception as e:
         print(f"Error in search_invoices_for_reassignment: {str(e)}")
+        if raise_errors:
+            raise
         return []
 
 
 def reassign_selected_invoices(invoice_ids: List[str], new_contact_id: str,
-                             access_token: str = None, tenant_id: str = None) -> Tuple[List[str], List[str]]:
+                             access_token: str = None, tenant_id: str = None,
+                             progress_callback: Optional[Callable[[int, int], None]] = None) -> Tuple[List[str], List[str]]:
     """
     Standalone function to reassign selected invoices to new contact.
     
@@ -815,20 +932,23 @@ def reassign_selected_invoices(invoice_ids: List[str], new_contact_id: str,
         new_contact_id (str): ContactID of new contact
         access_token (str, optional): Existing access token
         tenant_id (str, optional): Existing tenant ID
+        progress_callback (callable, optional): Called as (completed, total)
         
     Returns:
         tuple: (successful_ids, failed_ids)
     """
     try:
         manager = XeroInvoiceManager(access_token, tenant_id)
-        return manager.reassign_multiple_invoices(invoice_ids, new_contact_id)
+        return manager.reassign_multiple_invoices(invoice_ids, new_contact_id,
+                                                   progress_callback=progress_callback)
     except Exception as e:
         print(f"Error in reassign_selected_invoices: {str(e)}")
         return [], invoice_ids
 
 
 def search_repeating_invoices_for_contact(old_contact_id: str, 
-                                        access_token: str = None, tenant_id: str = None) -> List[Dict[str, Any]]:
+                                        access_token: str = None, tenant_id: str = None,
+                                        raise_errors: bool = False) -> List[Dict[str, Any]]:
     """
     Standalone function to search for repeating invoice templates for a contact.
     
@@ -836,15 +956,18 @@ def search_repeating_invoices_for_contact(old_contact_id: str,
         old_contact_id (str): ContactID of old contact
         access_token (str, optional): Existing access token
         tenant_id (str, optional): Existing tenant ID
+        raise_errors (bool): Raise on failure so callers can tell it apart from "no templates"
         
     Returns:
         list: List of repeating invoice templates
     """
     try:
         manager = XeroInvoiceManager(access_token, tenant_id)
-        return manager.search_repeating_invoices_by_contact(old_contact_id)
+        return manager.search_repeating_invoices_by_contact(old_contact_id, raise_errors=raise_errors)
     except Exception as e:
         print(f"Error in search_repeating_invoices_for_contact: {str(e)}")
+        if raise_errors:
+            raise
         return []
 
 
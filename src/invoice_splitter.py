@@ -22,9 +22,9 @@ UPDATED: Now uses billing schedules from constants.py instead of hardcoded value
 import os
 import json
 import base64
-import math
 from typing import Dict, Optional, Any, List, Tuple
 from datetime import datetime, date, timedelta
+from decimal import Decimal, ROUND_CEILING, ROUND_HALF_UP
 from calendar import monthrange
 from dotenv import load_dotenv
 import requests
@@ -40,6 +40,7 @@ from constants import (
     can_split_invoices,
     QUARTERLY_MONTHS
 )
+from xero_api import dump_json, get_http_session
 
 # Load environment variables
 load_dotenv()
@@ -48,17 +49,28 @@ if not os.getenv('XERO_CLIENT_ID'):
     env_path = os.path.join(parent_dir, '.env')
     load_dotenv(env_path)
 
+# Split amounts are rounded up to 10p; scaled line items to the penny
+TEN_PENCE = Decimal('0.1')
+PENNY = Decimal('0.01')
+
+
+def _to_decimal(value) -> Decimal:
+    """Exact Decimal for an amount from Xero's JSON (float, str or None)."""
+    return Decimal(str(value or 0))
+
 
 class XeroInvoiceSplitter:
     """Main class for invoice splitting operations."""
     
-    def __init__(self, access_token: str = None, tenant_id: str = None):
+    def __init__(self, access_token: str = None, tenant_id: str = None,
+                 session: Optional[requests.Session] = None):
         """
         Initialize the Xero Invoice Splitter.
         
         Args:
             access_token (str, optional): Existing access token
             tenant_id (str, optional): Existing tenant ID
+            session (requests.Session, optional): HTTP session; defaults to the shared pool
         """
         self.client_id = os.getenv('XERO_CLIENT_ID')
         self.client_secret = os.getenv('XERO_CLIENT_SECRET')
@@ -69,6 +81,7 @@ class XeroInvoiceSplitter:
         self.access_token = access_token
         self.tenant_id = tenant_id
         self.base_url = "https://api.xero.com/api.xro/2.0"
+        self.session = session or get_http_session()
         
         # If no token provided, we'll need to authenticate
         if not self.access_token:
@@ -96,7 +109,7 @@ class XeroInvoiceSplitter:
                 'Content-Type': 'application/x-www-form-urlencoded'
             }
             
-            response = requests.post(
+            response = self.session.post(
                 'https://identity.xero.com/connect/token',
                 data=token_data,
                 headers=headers
@@ -124,7 +137,7 @@ class XeroInvoiceSplitter:
                 'Accept': 'application/json'
             }
             
-            response = requests.get(
+            response = self.session.get(
                 'https://api.xero.com/connections',
                 headers=headers
             )
@@ -137,7 +150,7 @@ class XeroInvoiceSplitter:
                     return True
             
             # Fallback method
-            org_response = requests.get(
+            org_response = self.session.get(
                 f'{self.base_url}/Organisations',
                 headers={
                     'Authorization': f'Bearer {self.access_token}',
@@ -318,12 +331,14 @@ class XeroInvoiceSplitter:
             # Final fallback: assume 90 days
             return invoice_date, invoice_date + timedelta(days=89)
     
-    def get_latest_unpaid_invoice(self, contact_id: str) -> Optional[Dict[str, Any]]:
+    def get_latest_unpaid_invoice(self, contact_id: str,
+                                  raise_errors: bool = False) -> Optional[Dict[str, Any]]:
         """
         Get the most recent unpaid invoice for a contact.
         
         Args:
             contact_id (str): ContactID to search for
+            raise_errors (bool): Raise on failure instead of returning None (None then always means "none found")
             
         Returns:
             dict: Latest unpaid invoice data if found, None otherwise
@@ -340,22 +355,32 @@ class XeroInvoiceSplitter:
             
             print(f"Searching for latest unpaid invoice for contact: {contact_id}")
             
-            # Get invoices for this contact, ordered by date descending
-            params = {
-                'ContactIDs': contact_id,
-                'order': 'Date DESC',
-                'Statuses': 'AUTHORISED,SUBMITTED'  # Only get unpaid invoices
-            }
-            
-            response = requests.get(
-                f'{self.base_url}/Invoices',
-                headers=headers,
-                params=params
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                invoices = data.get('Invoices', [])
+            # Get invoices for this contact, ordered by date descending. Paged so
+            # only the newest 100 (with line items) come back in the common case
+            # instead of the contact's whole invoice history.
+            page = 1
+            
+            while True:
+                params = {
+                    'ContactIDs': contact_id,
+                    'order': 'Date DESC',
+                    'Statuses': 'AUTHORISED,SUBMITTED',  # Only get unpaid invoices
+                    'page': page
+                }
+                
+                response = self.session.get(
+                    f'{self.base_url}/Invoices',
+                    headers=headers,
+                    params=params
+                )
+                
+                if response.status_code != 200:
+                    print(f"❌ Error searching for invoices: {response.status_code} - {response.text}")
+                    if raise_errors:
+                        raise RuntimeError(f"{response.status_code} - {response.text}")
+                    return None
+                
+                invoices = response.json().get('Invoices', [])
                 
                 # Find the first invoice with outstanding amount
                 for invoice in invoices:
@@ -369,14 +394,19 @@ class XeroInvoiceSplitter:
                         
                         return detailed_invoice if detailed_invoice else invoice
                 
-                print("ℹ️ No unpaid invoices found for contact")
-                return None
-            else:
-                print(f"❌ Error searching for invoices: {response.status_code} - {response.text}")
-                return None
+                # Xero pages hold 100 invoices; a short page is the last one
+                if len(invoices) < 100:
+                    break
+                
+                page += 1
+            
+            print("ℹ️ No unpaid invoices found for contact")
+            return None
                 
         except Exception as e:
             print(f"❌ Error getting latest unpaid invoice: {str(e)}")
+            if raise_errors:
+                raise
             return None
     
     def get_invoice_details(self, invoice_id: str) -> Optional[Dict[str, Any]]:
@@ -399,7 +429,7 @@ class XeroInvoiceSplitter:
             if self.tenant_id and self.tenant_id != "custom_connection":
                 headers['Xero-Tenant-Id'] = self.tenant_id
             
-            response = requests.get(
+            response = self.session.get(
                 f'{self.base_url}/Invoices/{invoice_id}',
                 headers=headers
             )
@@ -479,20 +509,17 @@ class XeroInvoiceSplitter:
             new_occupier_days = (period_end - move_in_date).days + 1
             
             # Get invoice amounts
-            total_amount = float(invoice.get('Total', 0))
-            amount_due = float(invoice.get('AmountDue', 0))
+            total_amount = _to_decimal(invoice.get('Total'))
+            amount_due = _to_decimal(invoice.get('AmountDue'))
             
-            # Calculate split amounts (daily pro-rata)
+            # Calculate split amounts (daily pro-rata), in Decimal so no float error
+            # can push an amount over a 10p boundary before rounding
             daily_rate = total_amount / total_days
             
-            previous_occupier_amount = daily_rate * previous_occupier_days
-            new_occupier_amount = daily_rate * new_occupier_days
-            void_amount = daily_rate * void_days
-            
             # Round up to nearest 10p (£0.10)
-            previous_occupier_amount = math.ceil(previous_occupier_amount * 10) / 10
-            new_occupier_amount = math.ceil(new_occupier_amount * 10) / 10
-            void_amount = math.ceil(void_amount * 10) / 10
+            previous_occupier_amount = (daily_rate * previous_occupier_days).quantize(TEN_PENCE, ROUND_CEILING)
+            new_occupier_amount = (daily_rate * new_occupier_days).quantize(TEN_PENCE, ROUND_CEILING)
+            void_amount = (daily_rate * void_days).quantize(TEN_PENCE, ROUND_CEILING)
             
             return {
                 'success': True,
@@ -532,14 +559,14 @@ class XeroInvoiceSplitter:
                 'error': f'Error calculating split: {str(e)}'
             }
     
-    def modify_existing_invoice(self, invoice: Dict[str, Any], new_amount: float, 
+    def modify_existing_invoice(self, invoice: Dict[str, Any], new_amount: Decimal, 
                                period_description: str) -> bool:
         """
         Modify existing invoice to reflect only the previous occupier's portion.
         
         Args:
             invoice (dict): Original invoice data
-            new_amount (float): New total amount for previous occupier
+            new_amount (Decimal): New total amount for previous occupier
             period_description (str): Description of the period covered
             
         Returns:
@@ -556,28 +583,28 @@ class XeroInvoiceSplitter:
                 headers['Xero-Tenant-Id'] = self.tenant_id
             
             invoice_id = invoice.get('InvoiceID')
-            original_total = float(invoice.get('Total', 0))
+            original_total = _to_decimal(invoice.get('Total'))
             
             # Calculate scaling factor
-            scale_factor = new_amount / original_total
+            scale_factor = _to_decimal(new_amount) / original_total
             
             # Modify line items proportionally
             modified_line_items = []
             for line_item in invoice.get('LineItems', []):
-                original_line_amount = float(line_item.get('LineAmount', 0))
-                new_line_amount = original_line_amount * scale_factor
+                original_line_amount = _to_decimal(line_item.get('LineAmount'))
                 
                 # Round line amount to 2 decimal places
-                new_line_amount = round(new_line_amount, 2)
+                new_line_amount = (original_line_amount * scale_factor).quantize(PENNY, ROUND_HALF_UP)
+                unit_amount = (new_line_amount / _to_decimal(line_item.get('Quantity', 1))).quantize(PENNY, ROUND_HALF_UP)
                 
                 modified_line_item = {
                     'LineItemID': line_item.get('LineItemID'),
                     'Description': f"{line_item.get('Description', '')} ({period_description})",
                     'Quantity': line_item.get('Quantity', 1),
-                    'UnitAmount': round(new_line_amount / float(line_item.get('Quantity', 1)), 2),
+                    'UnitAmount': float(unit_amount),
                     'AccountCode': line_item.get('AccountCode', ''),
                     'TaxType': line_item.get('TaxType', ''),
-                    'LineAmount': new_line_amount
+                    'LineAmount': float(new_line_amount)
                 }
                 
                 # Include optional fields if they exist
@@ -595,10 +622,10 @@ class XeroInvoiceSplitter:
             
             print(f"Modifying invoice {invoice.get('InvoiceNumber')} from £{original_total:.2f} to £{new_amount:.2f}")
             
-            response = requests.post(
+            response = self.session.post(
                 f'{self.base_url}/Invoices/{invoice_id}',
                 headers=headers,
-                json=payload
+                data=dump_json(payload)
             )
             
             if response.status_code in [200, 204]:
@@ -613,14 +640,14 @@ class XeroInvoiceSplitter:
             return False
     
     def create_new_invoice(self, original_invoice: Dict[str, Any], new_contact_id: str, 
-                          new_amount: float, period_description: str) -> Optional[Dict[str, Any]]:
+                          new_amount: Decimal, period_description: str) -> Optional[Dict[str, Any]]:
         """
         Create new invoice for new occupier based on original invoice structure.
         
         Args:
             original_invoice (dict): Original invoice data to base new invoice on
             new_contact_id (str): ContactID of new occupier
-            new_amount (float): Total amount for new occupier
+            new_amount (Decimal): Total amount for new occupier
             period_description (str): Description of the period covered
             
         Returns:
@@ -636,25 +663,25 @@ class XeroInvoiceSplitter:
             if self.tenant_id and self.tenant_id != "custom_connection":
                 headers['Xero-Tenant-Id'] = self.tenant_id
             
-            original_total = float(original_invoice.get('Total', 0))
-            scale_factor = new_amount / original_total
+            original_total = _to_decimal(original_invoice.get('Total'))
+            scale_factor = _to_decimal(new_amount) / original_total
             
             # Create line items proportionally
             new_line_items = []
             for line_item in original_invoice.get('LineItems', []):
-                original_line_amount = float(line_item.get('LineAmount', 0))
-                new_line_amount = original_line_amount * scale_factor
+                original_line_amount = _to_decimal(line_item.get('LineAmount'))
                 
                 # Round line amount to 2 decimal places
-                new_line_amount = round(new_line_amount, 2)
+                new_line_amount = (original_line_amount * scale_factor).quantize(PENNY, ROUND_HALF_UP)
+                unit_amount = (new_line_amount / _to_decimal(line_item.get('Quantity', 1))).quantize(PENNY, ROUND_HALF_UP)
                 
                 new_line_item = {
                     'Description': f"{line_item.get('Description', '')} ({period_description})",
                     'Quantity': line_item.get('Quantity', 1),
-                    'UnitAmount': round(new_line_amount / float(line_item.get('Quantity', 1)), 2),
+                    'UnitAmount': float(unit_amount),
                     'AccountCode': line_item.get('AccountCode', ''),
                     'TaxType': line_item.get('TaxType', ''),
-                    'LineAmount': new_line_amount
+                    'LineAmount': float(new_line_amount)
                 }
                 
                 # Include optional fields if they exist
@@ -689,10 +716,10 @@ class XeroInvoiceSplitter:
             
             print(f"Creating new invoice for new occupier: £{new_amount:.2f}")
             
-            response = requests.post(
+            response = self.session.post(
                 f'{self.base_url}/Invoices',
                 headers=headers,
-                json=payload
+                data=dump_json(payload)
             )
             
             if response.status_code == 200:
@@ -717,7 +744,8 @@ class XeroInvoiceSplitter:
 
 # Standalone functions for integration with existing workflow
 def get_latest_invoice_for_splitting(old_contact_id: str, access_token: str = None, 
-                                   tenant_id: str = None) -> Optional[Dict[str, Any]]:
+                                   tenant_id: str = None,
+                                   raise_errors: bool = False) -> Optional[Dict[str, Any]]:
     """
     Standalone function to get latest unpaid invoice for splitting.
     
@@ -725,15 +753,18 @@ def get_latest_invoice_for_splitting(old_contact_id: str, access_token: str = No
         old_contact_id (str): ContactID of previous occupier
         access_token (str, optional): Existing access token
         tenant_id (str, optional): Existing tenant ID
+        raise_errors (bool): Raise on failure so callers can tell it apart from "none found"
         
     Returns:
         dict: Latest unpaid invoice if found, None otherwise
     """
     try:
         splitter = XeroInvoiceSplitter(access_token, tenant_id)
-        return splitter.get_latest_unpaid_invoice(old_contact_id)
+        return splitter.get_latest_unpaid_invoice(old_contact_id, raise_errors=raise_errors)
     except Exception as e:
         print(f"Error in get_latest_invoice_for_splitting: {str(e)}")
+        if raise_errors:
+            raise
         return None
 
 
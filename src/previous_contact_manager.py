@@ -23,12 +23,13 @@ CORRECTIONS:
 import os
 import json
 import base64
-from typing import Dict, Optional, Any, List, Tuple
+from typing import Dict, Optional, Any, List, Tuple, Callable
 from dotenv import load_dotenv
 import requests
 
 # Import our business rules
 from constants import parse_account_number, CONTACT_CODES
+from xero_api import dump_json, get_http_session
 
 # Load environment variables
 load_dotenv()
@@ -41,13 +42,15 @@ if not os.getenv('XERO_CLIENT_ID'):
 class XeroPreviousContactManager:
     """Main class for managing previous contact status and group assignments."""
     
-    def __init__(self, access_token: str = None, tenant_id: str = None):
+    def __init__(self, access_token: str = None, tenant_id: str = None,
+                 session: Optional[requests.Session] = None):
         """
         Initialize the Xero Previous Contact Manager.
         
         Args:
             access_token (str, optional): Existing access token
             tenant_id (str, optional): Existing tenant ID
+            session (requests.Session, optional): HTTP session; defaults to the shared pool
         """
         self.client_id = os.getenv('XERO_CLIENT_ID')
         self.client_secret = os.getenv('XERO_CLIENT_SECRET')
@@ -58,6 +61,7 @@ class XeroPreviousContactManager:
         self.access_token = access_token
         self.tenant_id = tenant_id
         self.base_url = "https://api.xero.com/api.xro/2.0"
+        self.session = session or get_http_session()
         
         # If no token provided, we'll need to authenticate
         if not self.access_token:
@@ -85,7 +89,7 @@ class XeroPreviousContactManager:
                 'Content-Type': 'application/x-www-form-urlencoded'
             }
             
-            response = requests.post(
+            response = self.session.post(
                 'https://identity.xero.com/connect/token',
                 data=token_data,
                 headers=headers
@@ -113,7 +117,7 @@ class XeroPreviousContactManager:
                 'Accept': 'application/json'
             }
             
-            response = requests.get(
+            response = self.session.get(
                 'https://api.xero.com/connections',
                 headers=headers
             )
@@ -128,7 +132,7 @@ class XeroPreviousContactManager:
             print(f"Connections endpoint response: {response.status_code} - {response.text}")
             
             # Fallback method
-            org_response = requests.get(
+            org_response = self.session.get(
                 f'{self.base_url}/Organisations',
                 headers={
                     'Authorization': f'Bearer {self.access_token}',
@@ -173,7 +177,7 @@ class XeroPreviousContactManager:
             
             print(f"Getting balance for contact: {contact_id}")
             
-            response = requests.get(
+            response = self.session.get(
                 f'{self.base_url}/Contacts/{contact_id}',
                 headers=headers
             )
@@ -231,7 +235,7 @@ class XeroPreviousContactManager:
                 headers['Xero-Tenant-Id'] = self.tenant_id
             
             # Get contact details which includes ContactGroups
-            response = requests.get(
+            response = self.session.get(
                 f'{self.base_url}/Contacts/{contact_id}',
                 headers=headers
             )
@@ -283,7 +287,7 @@ class XeroPreviousContactManager:
             
             print(f"Removing contact {contact_id} from group {group_id}")
             
-            response = requests.delete(
+            response = self.session.delete(
                 f'{self.base_url}/ContactGroups/{group_id}/Contacts/{contact_id}',
                 headers=headers
             )
@@ -319,7 +323,7 @@ class XeroPreviousContactManager:
             
             print("Searching for '+ Previous accounts still due' contact group...")
             
-            response = requests.get(
+            response = self.session.get(
                 f'{self.base_url}/ContactGroups',
                 headers=headers
             )
@@ -376,10 +380,10 @@ class XeroPreviousContactManager:
             
             print(f"Adding contact {contact_id} to '+ Previous accounts still due' group {group_id}")
             
-            response = requests.put(
+            response = self.session.put(
                 f'{self.base_url}/ContactGroups/{group_id}/Contacts',
                 headers=headers,
-                json=payload
+                data=dump_json(payload)
             )
             
             # FIXED: Properly handle both 200 and 204 responses
@@ -464,10 +468,10 @@ class XeroPreviousContactManager:
             }
             
             print(f"🔄 Attempt 1: POST to /Contacts with Contacts array")
-            response1 = requests.post(
+            response1 = self.session.post(
                 f'{self.base_url}/Contacts',
                 headers=headers,
-                json=payload1
+                data=dump_json(payload1)
             )
             
             print(f"   Response: {response1.status_code} - {response1.text[:200]}")
@@ -482,10 +486,10 @@ class XeroPreviousContactManager:
             
             # APPROACH 2: PUT with contact_id in URL
             print(f"🔄 Attempt 2: PUT to /Contacts/{contact_id}")
-            response2 = requests.put(
+            response2 = self.session.put(
                 f'{self.base_url}/Contacts/{contact_id}',
                 headers=headers,
-                json=payload1  # Same payload structure
+                data=dump_json(payload1)  # Same payload structure
             )
             
             print(f"   Response: {response2.status_code} - {response2.text[:200]}")
@@ -505,10 +509,10 @@ class XeroPreviousContactManager:
             }
             
             print(f"🔄 Attempt 3: POST to /Contacts with direct object")
-            response3 = requests.post(
+            response3 = self.session.post(
                 f'{self.base_url}/Contacts',
                 headers=headers,
-                json=payload3
+                data=dump_json(payload3)
             )
             
             print(f"   Response: {response3.status_code} - {response3.text[:200]}")
@@ -522,10 +526,10 @@ class XeroPreviousContactManager:
             
             # APPROACH 4: POST to specific contact endpoint with contact_id (original approach)
             print(f"🔄 Attempt 4: POST to /Contacts/{contact_id} (original approach)")
-            response4 = requests.post(
+            response4 = self.session.post(
                 f'{self.base_url}/Contacts/{contact_id}',
                 headers=headers,
-                json=payload1
+                data=dump_json(payload1)
             )
             
             print(f"   Response: {response4.status_code} - {response4.text[:200]}")
@@ -548,10 +552,10 @@ class XeroPreviousContactManager:
             }
             
             print(f"🔄 Attempt 5: POST to /Contacts with minimal payload (account number only)")
-            response5 = requests.post(
+            response5 = self.session.post(
                 f'{self.base_url}/Contacts',
                 headers=headers,
-                json=payload5
+                data=dump_json(payload5)
             )
             
             print(f"   Response: {response5.status_code} - {response5.text[:200]}")
@@ -570,10 +574,10 @@ class XeroPreviousContactManager:
                 }
                 
                 print(f"🔄 Attempt 5b: Update status separately")
-                response5b = requests.post(
+                response5b = self.session.post(
                     f'{self.base_url}/Contacts',
                     headers=headers,
-                    json=payload_status
+                    data=dump_json(payload_status)
                 )
                 
                 print(f"   Status update response: {response5b.status_code} - {response5b.text[:200]}")
@@ -602,12 +606,15 @@ class XeroPreviousContactManager:
             traceback.print_exc()
             return False
     
-    def handle_previous_contact_workflow(self, old_contact_id: str) -> Dict[str, Any]:
+    def handle_previous_contact_workflow(self, old_contact_id: str,
+                                         progress_callback: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         ENHANCED VERSION: Main workflow function to handle previous contact after successful reassignment.
         
         Args:
             old_contact_id (str): ContactID of the previous contact
+            progress_callback (callable, optional): Called with each step's label
+                as the workflow reaches it
             
         Returns:
             dict: Result with success status and details
@@ -621,11 +628,16 @@ class XeroPreviousContactManager:
             'error': None
         }
         
+        def step(label: str):
+            print(label)
+            if progress_callback:
+                progress_callback(label)
+        
         try:
             print(f"\n🔄 Starting previous contact workflow for: {old_contact_id}")
             
             # Step 1: Get contact balance
-            print("📊 Step 1: Getting contact balance...")
+            step("📊 Step 1: Getting contact balance...")
             balance_info = self.get_contact_balance(old_contact_id)
             
             if not balance_info:
@@ -641,11 +653,11 @@ class XeroPreviousContactManager:
             print(f"📋 Action: {'Keep ACTIVE (has balance)' if has_balance else 'Set INACTIVE (zero balance)'}")
             
             # Step 2: Get current contact groups
-            print("👥 Step 2: Getting current contact groups...")
+            step("👥 Step 2: Getting current contact groups...")
             current_groups = self.get_contact_groups_for_contact(old_contact_id)
             
             # Step 3: Remove from current groups
-            print(f"🗑️ Step 3: Removing from {len(current_groups)} current groups...")
+            step(f"🗑️ Step 3: Removing from {len(current_groups)} current groups...")
             removed_groups = []
             
             for group in current_groups:
@@ -661,7 +673,7 @@ class XeroPreviousContactManager:
             result['groups_removed'] = removed_groups
             
             # Step 4: Find "+ Previous accounts still due" group
-            print("🔍 Step 4: Finding '+ Previous accounts still due' group...")
+            step("🔍 Step 4: Finding '+ Previous accounts still due' group...")
             previous_group = self.find_previous_accounts_group()
             
             if not previous_group:
@@ -670,7 +682,7 @@ class XeroPreviousContactManager:
                 return result
             
             # Step 5: Add to "+ Previous accounts still due" group
-            print("➕ Step 5: Adding to '+ Previous accounts still due' group...")
+            step("➕ Step 5: Adding to '+ Previous accounts still due' group...")
             group_id = previous_group.get('ContactGroupID')
             
             if self.add_contact_to_group(old_contact_id, group_id):
@@ -681,7 +693,7 @@ class XeroPreviousContactManager:
                 # Don't return early - still try contact update
             
             # Step 6: Update contact to /P status
-            print("🏷️ Step 6: Updating contact to /P status...")
+            step("🏷️ Step 6: Updating contact to /P status...")
             if self.update_contact_to_previous_status(old_contact_id, contact_data, has_balance):
                 result['contact_updated'] = True
                 print("   ✅ Successfully updated contact to /P status")
@@ -762,7 +774,8 @@ def get_previous_contact_balance(old_contact_id: str, access_token: str = None,
         return None
 
 
-def handle_previous_contact_after_reassignment(old_contact_id: str, access_token: str = None, tenant_id: str = None) -> Dict[str, Any]:
+def handle_previous_contact_after_reassignment(old_contact_id: str, access_token: str = None, tenant_id: str = None,
+                                               progress_callback: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
     """
     Standalone function to handle previous contact after successful invoice reassignment.
     
@@ -770,13 +783,14 @@ def handle_previous_contact_after_reassignment(old_contact_id: str, access_token
         old_contact_id (str): ContactID of previous contact
         access_token (str, optional): Existing access token
         tenant_id (str, optional): Existing tenant ID
+        progress_callback (callable, optional): Called with each step's label
         
     Returns:
         dict: Result with success status and details
     """
     try:
         manager = XeroPreviousContactManager(access_token, tenant_id)
-        return manager.handle_previous_contact_workflow(old_contact_id)
+        return manager.handle_previous_contact_workflow(old_contact_id, progress_callback)
     except Exception as e:
         print(f"Error in handle_previous_contact_after_reassignment: {str(e)}")
         import traceback
@@ -10,9 +10,14 @@ UPDATED: Now includes invoice splitting functionality for occupier transitions.
 
 import streamlit as st
 import time
-from typing import Optional, Dict, Any, List
+import hmac
+import hashlib
+from typing import Optional, Dict, Any, List, Tuple, NamedTuple
 import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
 from datetime import date, datetime
+from decimal import Decimal
 
 # Import our existing modules (keep backend logic unchanged)
 from contact_manager import XeroContactManager
@@ -34,28 +39,52 @@ from invoice_splitter import (
     calculate_invoice_split,
     execute_invoice_split
 )
+from xero_api import MAX_CONCURRENT_CALLS, take_unauthorized
 
+# Contact code dropdown options; CONTACT_CODES never changes at runtime
+_SORTED_CONTACT_CODES = tuple(sorted(CONTACT_CODES))
+
+# Invoice totals stay numeric; the grid formats them client-side
+_TOTAL_COLUMN = st.column_config.NumberColumn("Total", format="$%.2f")
+
+# Summary final status line and restart button label, indexed by previous_contact_processed
+_FINAL_STATUS = (
+    "**⚠️ Previous contact step still pending** - Complete Section 5 above to finish",
+    "**✅ All modules completed successfully!**"
+)
+_RESTART_LABEL = ("🔄 Reset Current Workflow", "🆕 Start New Workflow")
+
+# Invoice grid sizing: fits short lists exactly, scrolls (virtualised) past ~10 rows
+_GRID_ROW_HEIGHT = 35
+_GRID_MAX_HEIGHT = 400
+
+# Status badge shown next to each invoice in the reassignment list
+_STATUS_EMOJI = {'DRAFT': '🟡', 'SUBMITTED': '🟠', 'AUTHORISED': '🟢'}
+
+
+@st.cache_resource(show_spinner=False)
+def _expected_hash() -> bytes:
+    """SHA-256 of the app password, read from secrets once per process."""
+    return hashlib.sha256(st.secrets["APP_PASSWORD"].encode()).digest()
 
 # Authentication function
 def check_password():
-    if "password_authenticated" not in st.session_state:
-        st.session_state.password_authenticated = False
+    # Common path: already logged in, so no widgets and no secrets access
+    if st.session_state.password_authenticated:
+        return True
     
-    if not st.session_state.password_authenticated:
-        st.title("🔒 Xero Property Manager")
-        password = st.text_input("Password", type="password")
-        
-        if st.button("Login"):
-            if password == st.secrets["APP_PASSWORD"]:
-                st.session_state.password_authenticated = True
-                st.success("✅ Login successful!")
-                st.rerun()
-            else:
-                st.error("❌ Incorrect password")
-        
-        st.stop()
+    st.title("🔒 Xero Property Manager")
+    password = st.text_input("Password", type="password")
     
-    return True
+    if st.button("Login"):
+        if hmac.compare_digest(hashlib.sha256(password.encode()).digest(), _expected_hash()):
+            st.session_state.password_authenticated = True
+            st.success("✅ Login successful!")
+            st.rerun()
+        else:
+            st.error("❌ Incorrect password")
+    
+    st.stop()
 
 
 # Configure Streamlit page
@@ -199,73 +228,194 @@ h2, h3 {
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state variables (UPDATED: Added invoice splitting variables)
-if 'contact_manager' not in st.session_state:
-    st.session_state.contact_manager = None
-if 'password_authenticated' not in st.session_state:
-    st.session_state.password_authenticated = False
-if 'authenticated' not in st.session_state:
-    st.session_state.authenticated = False
-if 'existing_contact' not in st.session_state:
-    st.session_state.existing_contact = None
-if 'search_performed' not in st.session_state:
-    st.session_state.search_performed = False
-if 'new_contact' not in st.session_state:
-    st.session_state.new_contact = None
-if 'found_invoices' not in st.session_state:
-    st.session_state.found_invoices = []
-if 'selected_invoices' not in st.session_state:
-    st.session_state.selected_invoices = []
-if 'invoice_search_performed' not in st.session_state:
-    st.session_state.invoice_search_performed = False
-if 'found_repeating_templates' not in st.session_state:
-    st.session_state.found_repeating_templates = []
-if 'template_search_performed' not in st.session_state:
-    st.session_state.template_search_performed = False
-if 'previous_contact_balance' not in st.session_state:
-    st.session_state.previous_contact_balance = None
-if 'previous_contact_processed' not in st.session_state:
-    st.session_state.previous_contact_processed = False
-if 'contact_validation_result' not in st.session_state:
-    st.session_state.contact_validation_result = None
-if 'selected_contact_option' not in st.session_state:
-    st.session_state.selected_contact_option = None
-
-# NEW: Invoice splitting session state variables
-if 'invoice_splitting_mode' not in st.session_state:
-    st.session_state.invoice_splitting_mode = False
-if 'invoice_to_split' not in st.session_state:
-    st.session_state.invoice_to_split = None
-if 'split_calculation' not in st.session_state:
-    st.session_state.split_calculation = None
-if 'split_executed' not in st.session_state:
-    st.session_state.split_executed = False
-if 'vacate_date' not in st.session_state:
-    st.session_state.vacate_date = None
-if 'move_in_date' not in st.session_state:
-    st.session_state.move_in_date = None
+# Initial value of every session state key (UPDATED: Added invoice splitting variables)
+_DEFAULTS = {
+    'password_authenticated': False,
+    'authenticated': False,
+    'existing_contact': None,
+    'search_performed': False,
+    'new_contact': None,
+    'found_invoices': [],
+    'selected_invoices': set(),
+    # Invoices moved to the new contact; they are dropped from found_invoices
+    'reassigned_invoice_count': 0,
+    'invoice_search_performed': False,
+    'found_repeating_templates': [],
+    # Reference of the first found template, or None when there is none
+    'template_ref_display': None,
+    'template_search_performed': False,
+    'previous_contact_balance': None,
+    'previous_contact_processed': False,
+    'contact_validation_result': None,
+    'selected_contact_option': None,
+    # Validation results per (existing ContactID, contact code)
+    'validation_cache': {},
+    # NEW: Invoice splitting session state variables
+    'invoice_splitting_mode': False,
+    'invoice_to_split': None,
+    # (Total, AmountDue) of invoice_to_split as Decimals, parsed once for the banner
+    'split_invoice_amounts': None,
+    'split_calculation': None,
+    'split_executed': False,
+    'vacate_date': None,
+    'move_in_date': None,
+    # Old-contact lookups fetched in parallel right after the new contact is created
+    'prefetched': None,
+    # (summary fields, rendered markdown) from the last rerun
+    'summary_cache': None
+}
+
+# Login and Xero connection survive the Reset / Start New Workflow buttons
+_SESSION_KEYS = ('password_authenticated', 'authenticated')
+
+# Initial values restored by the Reset / Start New Workflow buttons
+_RESET_SENTINELS = {k: v for k, v in _DEFAULTS.items() if k not in _SESSION_KEYS}
+
+def _fresh(value):
+    """Copy list/set/dict defaults so sessions never share (and mutate) the same object."""
+    return value.copy() if isinstance(value, (list, set, dict)) else value
+
+# Initialize session state variables
+for key, value in _DEFAULTS.items():
+    st.session_state.setdefault(key, _fresh(value))
+
+def _reset_workflow():
+    """Reset all workflow state to sentinels so the next rerun starts from Section 1."""
+    st.session_state.update({key: _fresh(value) for key, value in _RESET_SENTINELS.items()})
+
+@lru_cache(maxsize=128)
+def _normalize_and_validate(raw: str) -> Tuple[str, bool]:
+    """Normalise a typed account number; 8-char property bases are valid searches too."""
+    account_number = raw.strip().upper()
+    return account_number, len(account_number) == 8 or validate_account_number(account_number)
+
+def _invoice_summary_rows(invoice_ids: List[str], invoice_by_id: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Build one table row per invoice ID for the reassignment summary."""
+    rows = []
+    for invoice_id in invoice_ids:
+        invoice = invoice_by_id.get(invoice_id, {})
+        rows.append({
+            "Invoice": invoice.get('InvoiceNumber', 'N/A'),
+            "Total": float(invoice.get('Total', 0))
+        })
+    return rows
+
+def _summary_markdown(old_name: str, original_account: str, new_name: str, new_account: str,
+                      total_found: int, reassigned: int, still_selected: int, template_searched: bool,
+                      template_ref: Optional[str], outstanding_str: Optional[str], has_balance: bool,
+                      split_executed: bool, processed: bool) -> str:
+    """Workflow summary bullets as one markdown string (memoised per session by _section_summary)."""
+    lines = [
+        "**1️⃣ Contact Creation:**",
+        f"- ✅ **Found existing contact:** {old_name} ({original_account})",
+        f"- ✅ **Created new contact:** {new_name} ({new_account})",
+        "",
+        "**2️⃣ Invoice Reassignment:**"
+    ]
+    if total_found:
+        lines.append(f"- ✅ **Found {total_found} invoices** for potential reassignment")
+        if reassigned:
+            lines.append(f"- ✅ **Successfully reassigned {reassigned} invoices** from old to new contact")
+        if still_selected:
+            lines.append(f"- ℹ️ **{still_selected} invoices still selected** (not yet reassigned)")
+        elif not reassigned:
+            lines.append("- ℹ️ **No invoices reassigned yet**")
+    else:
+        lines.append("- ℹ️ **No invoices found** for reassignment")
+
+    lines += ["", "**3️⃣ Repeating Invoice Template:**"]
+    if not template_searched:
+        lines.append("- ⚠️ **Template search not performed**")
+    elif template_ref is not None:
+        lines.append(f"- ✅ **Found template:** {template_ref}")
+        lines.append("- ⚠️ **Template may not have been reassigned yet**")
+    else:
+        lines.append("- ℹ️ **No repeating invoice template** found")
+
+    lines += ["", "**4️⃣ Previous Contact Management:**"]
+    if outstanding_str is not None:
+        lines.append(f"- ✅ **Checked balance:** {outstanding_str} outstanding")
+        if split_executed:
+            lines.append("- ✅ **Invoice splitting completed** - split invoice between occupiers")
+        if processed:
+            if has_balance:
+                lines.append("- ✅ **Set to ACTIVE + /P code** (has outstanding balance)")
+            else:
+                lines.append("- ✅ **Set to INACTIVE + /P code** (zero balance)")
+            lines.append("- ✅ **Moved to contact group:** '+ Previous accounts still due'")
+            lines.append(f"- ✅ **Previous contact processed:** {old_name}")
+
+    return "\n".join(lines)
+
+class Creds(NamedTuple):
+    """Xero credentials handed to the backend helper functions."""
+    access_token: str
+    tenant_id: str
+
+class ContactView(NamedTuple):
+    """Display fields of a Xero contact, read out of the raw dict once per rerun."""
+    id: Optional[str]
+    name: str
+    account_number: str
+
+_NO_CONTACT = ContactView(None, 'Unknown', 'N/A')
+
+def _contact_view(contact: Optional[Dict[str, Any]]) -> ContactView:
+    """Normalise a raw Xero contact dict (or None) into a ContactView."""
+    if not contact:
+        return _NO_CONTACT
+    return ContactView(contact.get('ContactID'), contact.get('Name', 'Unknown'), contact.get('AccountNumber', 'N/A'))
+
+def _creds() -> Creds:
+    """Current access token and tenant from the authenticated contact manager."""
+    manager = get_contact_manager()
+    return Creds(manager.access_token, manager.tenant_id)
+
+def _fragment_creds() -> Optional[Creds]:
+    """Credentials read once at fragment entry; None until authenticated so wrappers re-read after login."""
+    return _creds() if st.session_state.authenticated else None
+
+# Xero tokens live 30 minutes; rebuild the shared manager before its token goes stale
+_MANAGER_TTL = 1500
+
+@st.cache_resource(ttl=_MANAGER_TTL, show_spinner="Authenticating with Xero...")
+def _shared_contact_manager() -> XeroContactManager:
+    """Shared XeroContactManager, authenticated once per token lifetime and reused across sessions and reruns."""
+    manager = XeroContactManager()
+    # Best-effort: a failure here is retried (with error reporting) by authenticate_xero
+    manager.authenticate()
+    return manager
+
+def get_contact_manager() -> XeroContactManager:
+    """The shared contact manager, rebuilt (with a new token) after Xero answered a call with 401."""
+    if take_unauthorized():
+        _shared_contact_manager.clear()
+    return _shared_contact_manager()
 
 def initialize_contact_manager():
-    """Initialize and authenticate contact manager."""
-    if st.session_state.contact_manager is None:
-        try:
-            st.session_state.contact_manager = XeroContactManager()
-            return True
-        except Exception as e:
-            st.error(f"Failed to initialize contact manager: {str(e)}")
-            return False
-    return True
+    """Make sure the shared contact manager can be built (credentials present)."""
+    try:
+        get_contact_manager()
+        return True
+    except Exception as e:
+        st.error(f"Failed to initialize contact manager: {str(e)}")
+        return False
 
 def authenticate_xero():
     """Authenticate with Xero API."""
     if not st.session_state.authenticated:
-        if st.session_state.contact_manager is None:
-            if not initialize_contact_manager():
-                return False
+        if not initialize_contact_manager():
+            return False
+        
+        # The shared manager usually authenticated when it was built, so skip the spinner
+        manager = get_contact_manager()
+        if manager.access_token and manager.tenant_id:
+            st.session_state.authenticated = True
+            return True
         
         try:
             with st.spinner("Authenticating with Xero..."):
-                success = st.session_state.contact_manager.authenticate()
+                success = manager.authenticate()
                 if success:
                     st.session_state.authenticated = True
                     st.success("✅ Successfully authenticated with Xero!")
@@ -278,15 +428,36 @@ def authenticate_xero():
             return False
     return True
 
+def requires_xero_auth(default=None):
+    """Decorator: make sure Xero is authenticated first, returning a copy of default if it can't be."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not st.session_state.authenticated and not authenticate_xero():
+                return _fresh(default)
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _cached_search(account_number: str, tenant_id: str, _manager: XeroContactManager) -> Dict[str, Any]:
+    """Contact lookup cached per (account number, tenant); the manager is not hashed."""
+    contact = _manager.search_contact_by_account_number(account_number)
+    if contact is None:
+        # None means "not found" or a failed call; raising keeps either out of the cache
+        raise LookupError(f"No contact found for {account_number}")
+    return contact
+
+@requires_xero_auth()
 def search_contact(account_number: str):
     """Search for existing contact."""
-    if not st.session_state.authenticated:
-        if not authenticate_xero():
-            return None
-    
     try:
         with st.spinner(f"Searching for contact: {account_number}"):
-            contact = st.session_state.contact_manager.search_contact_by_account_number(account_number)
+            manager = get_contact_manager()
+            try:
+                contact = _cached_search(account_number, manager.tenant_id, manager)
+            except LookupError:
+                contact = None
             st.session_state.existing_contact = contact
             st.session_state.search_performed = True
             return contact
@@ -302,13 +473,15 @@ def create_new_contact(contact_data: Dict[str, str]):
     
     try:
         with st.spinner("Creating new contact..."):
-            new_contact = st.session_state.contact_manager.create_new_contact(
+            new_contact = get_contact_manager().create_new_contact(
                 st.session_state.existing_contact, 
                 contact_data
             )
             # Store new contact for Module 2
             if new_contact:
                 st.session_state.new_contact = new_contact
+                st.session_state.validation_cache = {}
+                _cached_search.clear()
             return new_contact
     except Exception as e:
         st.error(f"Error creating contact: {str(e)}")
@@ -319,84 +492,123 @@ def display_contact_details(contact: Dict[str, Any], title: str):
     contact_name = contact.get('Name', 'Unknown Contact')
     st.success(f"**Contact found:** {contact_name}")
 
-def search_invoices_for_old_contact(contact_id: str, move_in_date: date):
+# Read-only Xero lookups, cached for a few minutes. The access token rotates, so
+# it is passed unhashed (leading underscore) and only the tenant is part of the key.
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_invoices(contact_id: str, move_in_date: date, tenant_id: str, _access_token: str) -> List[Dict[str, Any]]:
+    """Cached invoice search for a contact after a move-in date; failures raise and are not cached."""
+    return search_invoices_for_reassignment(contact_id, move_in_date, _access_token, tenant_id,
+                                            raise_errors=True)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_templates(contact_id: str, tenant_id: str, _access_token: str) -> List[Dict[str, Any]]:
+    """Cached repeating invoice template search for a contact; failures raise and are not cached."""
+    return search_repeating_invoices_for_contact(contact_id, _access_token, tenant_id,
+                                                 raise_errors=True)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_balance(contact_id: str, tenant_id: str, _access_token: str) -> Dict[str, Any]:
+    """Cached balance lookup for a contact."""
+    balance_info = get_previous_contact_balance(contact_id, _access_token, tenant_id)
+    if balance_info is None:
+        # Raising keeps a failed lookup out of the cache
+        raise RuntimeError("Failed to get contact balance")
+    return balance_info
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_split_invoice(contact_id: str, tenant_id: str, _access_token: str) -> Dict[str, Any]:
+    """Cached lookup of a contact's latest unpaid invoice."""
+    invoice = get_latest_invoice_for_splitting(contact_id, _access_token, tenant_id, raise_errors=True)
+    if invoice is None:
+        # Raising keeps "nothing found" out of the cache (failed calls already raise)
+        raise LookupError("No unpaid invoice found")
+    return invoice
+
+@requires_xero_auth([])
+def search_invoices_for_old_contact(contact_id: str, move_in_date: date, creds: Optional[Creds] = None):
     """Search for invoices assigned to old contact after move-in date."""
-    if not st.session_state.authenticated:
-        if not authenticate_xero():
-            return []
-    
     try:
         with st.spinner(f"Searching for invoices after {move_in_date.strftime('%d %b %Y')}..."):
             # Use existing authentication from contact_manager
-            access_token = st.session_state.contact_manager.access_token
-            tenant_id = st.session_state.contact_manager.tenant_id
+            access_token, tenant_id = creds or _creds()
             
-            invoices = search_invoices_for_reassignment(
-                contact_id, 
-                move_in_date, 
-                access_token, 
-                tenant_id
-            )
+            invoices = _take_prefetched('invoices', contact_id, move_in_date)
+            if invoices is _MISS:
+                invoices = _fetch_invoices(contact_id, move_in_date, tenant_id, access_token)
             
             st.session_state.found_invoices = invoices
             st.session_state.invoice_search_performed = True
+            # Editor edits are stored by row position; drop them so they can't
+            # land on different invoices. Selection is re-seeded by InvoiceID.
+            st.session_state.pop("inv_editor", None)
             return invoices
     except Exception as e:
         st.error(f"Error searching for invoices: {str(e)}")
         return []
 
-def reassign_invoices(selected_invoice_ids: List[str], new_contact_id: str):
+def reassign_invoices(selected_invoice_ids: List[str], new_contact_id: str, creds: Optional[Creds] = None):
     """Reassign selected invoices to new contact."""
     try:
-        with st.spinner(f"Reassigning {len(selected_invoice_ids)} invoices..."):
+        total = len(selected_invoice_ids)
+        with st.status(f"Reassigning {total} invoices...", expanded=False) as status:
             # Use existing authentication from contact_manager
-            access_token = st.session_state.contact_manager.access_token
-            tenant_id = st.session_state.contact_manager.tenant_id
+            access_token, tenant_id = creds or _creds()
+            
+            # Updated from this (main) thread as each worker batch finishes
+            progress = st.progress(0.0)
+            
+            def on_progress(done: int, total: int):
+                progress.progress(done / total)
+                status.update(label=f"Reassigned {done}/{total} invoices...")
             
             successful, failed = reassign_selected_invoices(
                 selected_invoice_ids,
                 new_contact_id,
                 access_token,
-                tenant_id
+                tenant_id,
+                progress_callback=on_progress
             )
             
+            status.update(label=f"Reassigned {len(successful)} of {total} invoices",
+                          state="error" if failed else "complete")
+            
+            # Invoice lists, the old contact's balance and its latest unpaid invoice have changed
+            if successful:
+                _fetch_invoices.clear()
+                _fetch_balance.clear()
+                _fetch_split_invoice.clear()
+            
             return successful, failed
     except Exception as e:
         st.error(f"Error reassigning invoices: {str(e)}")
         return [], selected_invoice_ids
 
-def search_repeating_invoices_for_old_contact(contact_id: str):
+@requires_xero_auth([])
+def search_repeating_invoices_for_old_contact(contact_id: str, creds: Optional[Creds] = None):
     """Search for repeating invoice templates assigned to old contact."""
-    if not st.session_state.authenticated:
-        if not authenticate_xero():
-            return []
-    
     try:
         with st.spinner("Searching for repeating invoice templates..."):
             # Use existing authentication from contact_manager
-            access_token = st.session_state.contact_manager.access_token
-            tenant_id = st.session_state.contact_manager.tenant_id
+            access_token, tenant_id = creds or _creds()
             
-            templates = search_repeating_invoices_for_contact(
-                contact_id,
-                access_token,
-                tenant_id
-            )
+            templates = _take_prefetched('templates', contact_id)
+            if templates is _MISS:
+                templates = _fetch_templates(contact_id, tenant_id, access_token)
             
             st.session_state.found_repeating_templates = templates
+            st.session_state.template_ref_display = templates[0].get('Reference', 'N/A') if templates else None
             st.session_state.template_search_performed = True
             return templates
     except Exception as e:
         st.error(f"Error searching for repeating invoice templates: {str(e)}")
         return []
 
-def reassign_repeating_invoice_template(old_contact_id: str, new_contact_id: str):
+def reassign_repeating_invoice_template(old_contact_id: str, new_contact_id: str, creds: Optional[Creds] = None):
     """Reassign repeating invoice template from old to new contact."""
     try:
         with st.spinner("Reassigning repeating invoice template..."):
             # Use existing authentication from contact_manager
-            access_token = st.session_state.contact_manager.access_token
-            tenant_id = st.session_state.contact_manager.tenant_id
+            access_token, tenant_id = creds or _creds()
             
             result = reassign_repeating_invoice_template_for_contact(
                 old_contact_id,
@@ -405,6 +617,9 @@ def reassign_repeating_invoice_template(old_contact_id: str, new_contact_id: str
                 tenant_id
             )
             
+            if result.get('success'):
+                _fetch_templates.clear()
+            
             return result
     except Exception as e:
         st.error(f"Error reassigning repeating invoice template: {str(e)}")
@@ -413,37 +628,98 @@ def reassign_repeating_invoice_template(old_contact_id: str, new_contact_id: str
             'error': f"Error during template reassignment: {str(e)}"
         }
 
-def get_previous_contact_balance_info(old_contact_id: str):
+@requires_xero_auth()
+def get_previous_contact_balance_info(old_contact_id: str, creds: Optional[Creds] = None):
     """Get balance information for previous contact."""
-    if not st.session_state.authenticated:
-        if not authenticate_xero():
-            return None
-    
     try:
         with st.spinner("Checking previous contact balance..."):
             # Use existing authentication from contact_manager
-            access_token = st.session_state.contact_manager.access_token
-            tenant_id = st.session_state.contact_manager.tenant_id
+            access_token, tenant_id = creds or _creds()
             
-            balance_info = get_previous_contact_balance(
-                old_contact_id,
-                access_token,
-                tenant_id
-            )
+            balance_info = _take_prefetched('balance', old_contact_id)
+            # The balance lookup returns None only on failure, so that is a miss too
+            if balance_info is _MISS or balance_info is None:
+                # No prefetch to draw on: overlap the split-invoice lookup with the
+                # balance call so "Split Invoice" doesn't pay for a second round trip
+                prefetched = st.session_state.prefetched
+                if not prefetched or prefetched['contact_id'] != old_contact_id:
+                    prefetched = st.session_state.prefetched = {
+                        'contact_id': old_contact_id,
+                        'move_in_date': date.today()
+                    }
+                if 'split_invoice' not in prefetched:
+                    prefetched['split_invoice'] = _pool().submit(
+                        get_latest_invoice_for_splitting, old_contact_id, access_token, tenant_id,
+                        raise_errors=True
+                    )
+                balance_info = _fetch_balance(old_contact_id, tenant_id, access_token)
             
             return balance_info
     except Exception as e:
         st.error(f"Error getting previous contact balance: {str(e)}")
         return None
 
+@st.cache_resource(show_spinner=False)
+def _pool() -> ThreadPoolExecutor:
+    """Shared worker pool for independent Xero lookups, sized to Xero's per-tenant concurrency limit."""
+    return ThreadPoolExecutor(max_workers=MAX_CONCURRENT_CALLS)
+
+@requires_xero_auth()
+def prefetch_old_contact_artifacts(old_contact_id: str):
+    """Start background lookups of invoices, templates, balance and latest unpaid invoice for the old contact."""
+    try:
+        access_token, tenant_id = _creds()
+        move_in_date = date.today()
+        
+        # Workers only call backend functions; all st.* access stays on this thread.
+        # The futures are not awaited here, so the lookups run during user think-time.
+        # raise_errors lets a failed lookup surface from future.result() instead of
+        # looking like an empty result.
+        pool = _pool()
+        st.session_state.prefetched = {
+            'contact_id': old_contact_id,
+            'move_in_date': move_in_date,
+            'invoices': pool.submit(search_invoices_for_reassignment, old_contact_id, move_in_date,
+                                    access_token, tenant_id, raise_errors=True),
+            'templates': pool.submit(search_repeating_invoices_for_contact, old_contact_id,
+                                     access_token, tenant_id, raise_errors=True),
+            'balance': pool.submit(get_previous_contact_balance, old_contact_id, access_token, tenant_id),
+            'split_invoice': pool.submit(get_latest_invoice_for_splitting, old_contact_id,
+                                         access_token, tenant_id, raise_errors=True)
+        }
+    except Exception as e:
+        # Prefetch is best-effort; the section buttons fall back to live lookups
+        print(f"Error prefetching previous contact data: {str(e)}")
+        st.session_state.prefetched = None
+
+# Returned by _take_prefetched when there is no usable prefetched result
+_MISS = object()
+
+def _take_prefetched(kind: str, contact_id: str, move_in_date: Optional[date] = None):
+    """Return (and consume) a prefetched result if it matches the request, else _MISS (also on failure)."""
+    prefetched = st.session_state.prefetched
+    if not prefetched or prefetched['contact_id'] != contact_id:
+        return _MISS
+    if move_in_date is not None and prefetched['move_in_date'] != move_in_date:
+        return _MISS
+    
+    # Consumed once so later searches (e.g. after a reassignment) hit Xero again
+    future = prefetched.pop(kind, None)
+    if future is None:
+        return _MISS
+    
+    try:
+        # Still in flight is fine: waiting on it beats issuing the same request again
+        return future.result()
+    except Exception as e:
+        print(f"Prefetched {kind} lookup failed: {str(e)}")
+        return _MISS
+
+@requires_xero_auth()
 def validate_contact_creation(existing_contact, selected_code):
     """Validate contact creation and check for duplicates."""
-    if not st.session_state.authenticated:
-        if not authenticate_xero():
-            return None
-    
     try:
-        validation_result = st.session_state.contact_manager.validate_contact_before_creation(
+        validation_result = get_contact_manager().validate_contact_before_creation(
             existing_contact, selected_code
         )
         return validation_result
@@ -476,23 +752,23 @@ def handle_contact_creation_with_option(contact_data: Dict[str, str], selected_o
                 
         elif selected_option['type'] == 'create_next':
             # User chose to create next sequential contact
-            # Modify the contact data to use the next available account number
-            modified_contact_data = contact_data.copy()
-            
-            # Extract the contact code from the next available account number
+            # Use the contact code from the next available account number
             next_account = selected_option['account_number']
+            overrides = None
             if '/' in next_account:
-                contact_code = '/' + next_account.split('/')[-1]
-                modified_contact_data['contact_code'] = contact_code
+                overrides = {'contact_code': '/' + next_account.split('/')[-1]}
             
             with st.spinner("Creating next sequential contact..."):
-                new_contact = st.session_state.contact_manager.create_new_contact(
+                new_contact = get_contact_manager().create_new_contact(
                     st.session_state.existing_contact, 
-                    modified_contact_data
+                    contact_data,
+                    overrides
                 )
                 
                 if new_contact:
                     st.session_state.new_contact = new_contact
+                    st.session_state.validation_cache = {}
+                    _cached_search.clear()
                 return new_contact
         else:
             st.error("Invalid option selected")
@@ -502,20 +778,33 @@ def handle_contact_creation_with_option(contact_data: Dict[str, str], selected_o
         st.error(f"Error handling contact creation: {str(e)}")
         return None
 
-def handle_previous_contact_workflow(old_contact_id: str):
+def _previous_contact_done(result: Dict[str, Any]) -> bool:
+    """Whether the /P workflow got far enough to count as done (moved to the previous group)."""
+    return bool(result.get('success') or result.get('added_to_previous_group'))
+
+def handle_previous_contact_workflow(old_contact_id: str, creds: Optional[Creds] = None):
     """Handle the complete previous contact workflow."""
     try:
-        with st.spinner("Processing previous contact..."):
+        with st.status("Processing previous contact...", expanded=False) as status:
             # Use existing authentication from contact_manager
-            access_token = st.session_state.contact_manager.access_token
-            tenant_id = st.session_state.contact_manager.tenant_id
+            access_token, tenant_id = creds or _creds()
             
             result = handle_previous_contact_after_reassignment(
                 old_contact_id,
                 access_token,
-                tenant_id
+                tenant_id,
+                progress_callback=lambda label: status.update(label=label)
             )
             
+            succeeded = bool(result.get('success'))
+            status.update(label="Previous contact processed" if succeeded else "Previous contact workflow failed",
+                          state="complete" if succeeded else "error")
+            
+            # The old contact's account number and groups have changed
+            if _previous_contact_done(result):
+                _cached_search.clear()
+                _fetch_balance.clear()
+            
             return result
     except Exception as e:
         st.error(f"Error handling previous contact: {str(e)}")
@@ -525,41 +814,35 @@ def handle_previous_contact_workflow(old_contact_id: str):
         }
 
 # NEW: Invoice splitting functions
-def get_invoice_for_splitting(old_contact_id: str):
+@requires_xero_auth()
+def get_invoice_for_splitting(old_contact_id: str, creds: Optional[Creds] = None):
     """Get the latest unpaid invoice for splitting."""
-    if not st.session_state.authenticated:
-        if not authenticate_xero():
-            return None
-    
     try:
         with st.spinner("Finding latest unpaid invoice..."):
             # Use existing authentication from contact_manager
-            access_token = st.session_state.contact_manager.access_token
-            tenant_id = st.session_state.contact_manager.tenant_id
+            access_token, tenant_id = creds or _creds()
             
-            invoice = get_latest_invoice_for_splitting(
-                old_contact_id,
-                access_token,
-                tenant_id
-            )
+            # A prefetched None is a genuine "no unpaid invoice", not a miss
+            invoice = _take_prefetched('split_invoice', old_contact_id)
+            if invoice is not _MISS:
+                return invoice
             
-            return invoice
+            try:
+                return _fetch_split_invoice(old_contact_id, tenant_id, access_token)
+            except LookupError:
+                return None
     except Exception as e:
         st.error(f"Error getting invoice for splitting: {str(e)}")
         return None
 
+@requires_xero_auth()
 def calculate_split(invoice: Dict[str, Any], contact_data: Dict[str, Any], 
                    vacate_date: date, move_in_date: date):
     """Calculate invoice split between occupiers."""
-    if not st.session_state.authenticated:
-        if not authenticate_xero():
-            return None
-    
     try:
         with st.spinner("Calculating invoice split..."):
             # Use existing authentication from contact_manager
-            access_token = st.session_state.contact_manager.access_token
-            tenant_id = st.session_state.contact_manager.tenant_id
+            access_token, tenant_id = _creds()
             
             split_result = calculate_invoice_split(
                 invoice,
@@ -578,17 +861,13 @@ def calculate_split(invoice: Dict[str, Any], contact_data: Dict[str, Any],
             'error': f"Error calculating split: {str(e)}"
         }
 
+@requires_xero_auth()
 def execute_split(invoice: Dict[str, Any], new_contact_id: str, split_calculation: Dict[str, Any]):
     """Execute the invoice split (modify existing + create new)."""
-    if not st.session_state.authenticated:
-        if not authenticate_xero():
-            return None
-    
     try:
         with st.spinner("Executing invoice split..."):
             # Use existing authentication from contact_manager
-            access_token = st.session_state.contact_manager.access_token
-            tenant_id = st.session_state.contact_manager.tenant_id
+            access_token, tenant_id = _creds()
             
             split_result = execute_invoice_split(
                 invoice,
@@ -598,6 +877,12 @@ def execute_split(invoice: Dict[str, Any], new_contact_id: str, split_calculatio
                 tenant_id
             )
             
+            # The old invoice was adjusted and a new one created
+            if split_result and split_result.get('success'):
+                _fetch_invoices.clear()
+                _fetch_balance.clear()
+                _fetch_split_invoice.clear()
+            
             return split_result
     except Exception as e:
         st.error(f"Error executing split: {str(e)}")
@@ -606,6 +891,403 @@ def execute_split(invoice: Dict[str, Any], new_contact_id: str, split_calculatio
             'error': f"Error executing split: {str(e)}"
         }
 
+def _render_invoice_list(new_id: str, creds: Optional[Creds]):
+    """Invoice selection table shown inside the Section 3 fragment."""
+    # Skip building the per-invoice widgets entirely while the list is hidden
+    if st.toggle("Show invoice list", key="show_invoices", value=True):
+        # selected_invoices is a set, so the per-row "was it selected" check is O(1)
+        previously_selected = st.session_state.selected_invoices
+        rows = [
+            {
+                "Select": invoice.get('InvoiceID', '') in previously_selected,
+                "Invoice": invoice.get('InvoiceNumber', 'N/A'),
+                "Date": invoice.get('DateString', '')[:10] or 'N/A',
+                "Total": float(invoice.get('Total', 0)),
+                "Status": f"{_STATUS_EMOJI.get(invoice.get('Status'), '⚪')} {invoice.get('Status', 'N/A')}",
+                "InvoiceID": invoice.get('InvoiceID', '')
+            }
+            for invoice in st.session_state.found_invoices
+        ]
+
+        # One table widget instead of a checkbox per row; edits don't rerun until submit
+        with st.form("invoice_selection_form"):
+            edited_rows = st.data_editor(
+                rows,
+                hide_index=True,
+                use_container_width=True,
+                disabled=["Invoice", "Date", "Total", "Status", "InvoiceID"],
+                num_rows="fixed",
+                height=min(_GRID_MAX_HEIGHT, _GRID_ROW_HEIGHT * (len(rows) + 1) + 3),
+                column_config={
+                    "Select": st.column_config.CheckboxColumn("Select"),
+                    "Total": _TOTAL_COLUMN,
+                    # Kept in the returned rows for the selection, but not shown
+                    "InvoiceID": None
+                },
+                key="inv_editor"
+            )
+
+            reassign_clicked = st.form_submit_button("🔄 Reassign Selected Invoices", type="primary")
+
+        selected_for_reassignment = [row["InvoiceID"] for row in edited_rows if row["Select"]]
+
+        # Update selected invoices in session state
+        st.session_state.selected_invoices = set(selected_for_reassignment)
+
+        if reassign_clicked:
+            if not selected_for_reassignment:
+                st.warning("⚠️ Please select at least one invoice")
+            else:
+                successful, failed = reassign_invoices(selected_for_reassignment, new_id, creds)
+                invoice_by_id = {inv.get('InvoiceID'): inv for inv in st.session_state.found_invoices}
+                if successful:
+                    st.success(f"✅ Reassigned {len(successful)} invoices")
+                    st.dataframe(_invoice_summary_rows(successful, invoice_by_id), hide_index=True, use_container_width=True,
+                                 column_config={"Total": _TOTAL_COLUMN})
+                    st.session_state.selected_invoices = set()
+                    # Drop the moved rows and the editor's ticks (stored by row position)
+                    # so the next rerun can't re-select invoices that were already reassigned
+                    moved = set(successful)
+                    st.session_state.found_invoices = [
+                        inv for inv in st.session_state.found_invoices if inv.get('InvoiceID') not in moved
+                    ]
+                    st.session_state.reassigned_invoice_count += len(successful)
+                    st.session_state.pop("inv_editor", None)
+                    # Moving invoices changes the old contact's balance and latest unpaid invoice
+                    if st.session_state.prefetched:
+                        st.session_state.prefetched.pop('balance', None)
+                        st.session_state.prefetched.pop('split_invoice', None)
+                if failed:
+                    st.error(f"❌ Failed to reassign {len(failed)} invoices")
+                    st.dataframe(_invoice_summary_rows(failed, invoice_by_id), hide_index=True, use_container_width=True,
+                                 column_config={"Total": _TOTAL_COLUMN})
+
+def _validated_code_matches(selected_code) -> bool:
+    """Whether the submitted contact code is the one last validated; warns when it isn't."""
+    validation = st.session_state.contact_validation_result
+    if validation and validation.get('contact_code') == selected_code:
+        return True
+    st.warning("⚠️ Contact code changed since validation - click Validate & Proceed again")
+    return False
+
+@st.fragment
+def _section_create():
+    """New contact details, duplicate resolution and creation (Section 2)."""
+    st.markdown("---")
+
+    # Compact form layout; edits don't rerun (or validate) until submitted
+    with st.form("new_contact_form", border=False):
+        col1, col2, col3, col4 = st.columns(4)
+
+        with col1:
+            selected_code = st.selectbox("Contact Code *", options=_SORTED_CONTACT_CODES, index=None, placeholder="Choose...")
+
+        with col2:
+            first_name = st.text_input("First Name *", value="Occupier", placeholder="Enter first name")
+
+        with col3:
+            last_name = st.text_input("Last Name", placeholder="Enter last name")
+
+        with col4:
+            email = st.text_input("Email", placeholder="Enter email")
+
+        submitted = st.form_submit_button("✔️ Validate & Proceed", disabled=bool(st.session_state.new_contact))
+        # Proceed/Create are filled in below but submit this form, so they read the current inputs
+        action_slot = st.container()
+
+    if submitted and not selected_code:
+        st.warning("⚠️ Please choose a contact code")
+
+    # Show contact creation status
+    if st.session_state.new_contact:
+        st.success(f"✅ Contact created: {st.session_state.new_contact.get('Name', 'Unknown')} ({st.session_state.new_contact.get('AccountNumber', 'N/A')})")
+
+    # Validate on submit when the contact code changed (but NOT if contact already created)
+    if submitted and selected_code and not st.session_state.new_contact:
+        if st.session_state.contact_validation_result is None or \
+           st.session_state.contact_validation_result.get('contact_code') != selected_code:
+
+            # Validate the contact creation; flipping back to a code already checked
+            # for this contact reuses the earlier answer instead of calling Xero
+            cache_key = (st.session_state.existing_contact.get('ContactID'), selected_code)
+            validation_result = st.session_state.validation_cache.get(cache_key)
+            if validation_result is None:
+                validation_result = validate_contact_creation(st.session_state.existing_contact, selected_code)
+                if validation_result:
+                    st.session_state.validation_cache[cache_key] = validation_result
+
+            if validation_result:
+                validation_result['contact_code'] = selected_code  # Store which code was validated
+                st.session_state.contact_validation_result = validation_result
+                # Reset option selection when validation changes
+                st.session_state.selected_contact_option = None
+                st.rerun(scope="fragment")
+
+    # Show validation results (only if no contact created yet)
+    if st.session_state.contact_validation_result and not st.session_state.new_contact:
+        validation = st.session_state.contact_validation_result
+
+        if validation['status'] == 'available':
+            st.success(f"✅ {validation['message']}")
+
+        elif validation['status'] == 'duplicate_found':
+            st.warning(f"⚠️ {validation['message']}")
+
+            # Show options for duplicate resolution
+            st.markdown("**Choose how to proceed:**")
+
+            for i, option in enumerate(validation['options']):
+                option_key = f"option_{i}"
+
+                if option['type'] == 'use_existing':
+                    if st.button(f"📋 Use existing contact: {option['account_number']}", 
+                               key=option_key, use_container_width=True):
+                        st.session_state.selected_contact_option = option
+                        st.rerun(scope="fragment")
+
+                elif option['type'] == 'create_next':
+                    if st.button(f"🆕 Create new contact: {option['account_number']}", 
+                               key=option_key, use_container_width=True):
+                        st.session_state.selected_contact_option = option
+                        st.rerun(scope="fragment")
+
+                elif option['type'] == 'no_available':
+                    st.error("❌ No sequential numbers available - please choose a different contact code")
+
+        elif validation['status'] == 'error':
+            st.error(f"❌ {validation['message']}")
+
+    # Show selected option and create button (only if no contact created yet)
+    if st.session_state.selected_contact_option and not st.session_state.new_contact:
+        selected_option = st.session_state.selected_contact_option
+
+        if selected_option['type'] == 'use_existing':
+            st.info(f"📋 **Selected:** Use existing contact {selected_option['account_number']}")
+        elif selected_option['type'] == 'create_next':
+            st.info(f"🆕 **Selected:** Create new contact {selected_option['account_number']}")
+
+        # Validation and create button
+        can_create = bool(selected_code and first_name.strip())
+
+        if can_create:
+            if action_slot.form_submit_button("✅ Proceed with Selected Option", type="primary") and \
+               _validated_code_matches(selected_code):
+                new_contact_data = {
+                    'contact_code': selected_code,
+                    'first_name': first_name.strip(),
+                    'last_name': last_name.strip(),
+                    'email': email.strip()
+                }
+
+                new_contact = handle_contact_creation_with_option(new_contact_data, selected_option)
+                if new_contact:
+                    if selected_option['type'] == 'use_existing':
+                        st.success(f"✅ Using existing contact: {new_contact.get('Name', 'Unknown')}")
+                    else:
+                        st.success(f"✅ Created new contact: {new_contact.get('Name', 'Unknown')}")
+
+                    # Clear validation state for next time
+                    st.session_state.contact_validation_result = None
+                    st.session_state.selected_contact_option = None
+
+                    prefetch_old_contact_artifacts(st.session_state.existing_contact.get('ContactID'))
+                    # Sections 3-5 live outside this fragment, so rerun the whole app
+                    st.rerun()
+        else:
+            missing = []
+            if not selected_code:
+                missing.append("Contact Code")
+            if not first_name.strip():
+                missing.append("First Name")
+            st.warning(f"⚠️ Please provide: {', '.join(missing)}")
+
+    elif selected_code and st.session_state.contact_validation_result and \
+         st.session_state.contact_validation_result['status'] == 'available' and \
+         not st.session_state.new_contact:
+        # Normal creation path for available contacts
+        can_create = bool(selected_code and first_name.strip())
+
+        if can_create:
+            if action_slot.form_submit_button("🆕 Create New Contact", type="primary") and \
+               _validated_code_matches(selected_code):
+                new_contact_data = {
+                    'contact_code': selected_code,
+                    'first_name': first_name.strip(),
+                    'last_name': last_name.strip(),
+                    'email': email.strip()
+                }
+
+                new_contact = create_new_contact(new_contact_data)
+                if new_contact:
+                    st.success(f"✅ Created: {new_contact.get('Name', 'Unknown')}")
+
+                    # Clear validation state for next time
+                    st.session_state.contact_validation_result = None
+
+                    prefetch_old_contact_artifacts(st.session_state.existing_contact.get('ContactID'))
+                    # Sections 3-5 live outside this fragment, so rerun the whole app
+                    st.rerun()
+
+@st.fragment
+def _section_invoices(old_id: str, new_id: str):
+    """Invoice search and reassignment for the old contact (Section 3)."""
+    st.markdown("---")
+    creds = _fragment_creds()
+
+    # Compact invoice search
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        move_in_date = st.date_input("Move-in Date", value=date.today())
+    with col2:
+        if st.button("🔍 Find Invoices", type="primary"):
+            invoices = search_invoices_for_old_contact(old_id, move_in_date, creds)
+            if invoices:
+                st.success(f"✅ Found {len(invoices)} invoices")
+            else:
+                st.info("No invoices found")
+
+    # Display invoices compactly
+    if st.session_state.found_invoices:
+        _render_invoice_list(new_id, creds)
+
+@st.fragment
+def _section_template(old_id: str, new_id: str):
+    """Repeating invoice template search and reassignment (Section 4)."""
+    st.markdown("---")
+    creds = _fragment_creds()
+
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        st.write("**Repeating Invoice Template:**")
+    with col2:
+        if st.button("🔍 Find Template", type="primary"):
+            templates = search_repeating_invoices_for_old_contact(old_id, creds)
+            if templates:
+                st.success(f"✅ Found template")
+            else:
+                st.info("No template found")
+
+    # Handle template reassignment
+    reference = st.session_state.template_ref_display
+    if reference is not None:
+        st.write(f"Template: {reference}")
+
+        if st.button("🔄 Reassign Template", type="primary"):
+            result = reassign_repeating_invoice_template(old_id, new_id, creds)
+            if result.get('success'):
+                st.success("✅ Template reassigned")
+                st.session_state.found_repeating_templates = []
+                st.session_state.template_ref_display = None
+
+@st.fragment
+def _section_previous(old_id: str, old_name: str):
+    """Previous contact balance check and /P group / split options (Section 5)."""
+    st.markdown("---")
+    creds = _fragment_creds()
+
+    # Balance check
+    if not st.session_state.previous_contact_balance:
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            st.write(f"**Previous Contact:** {old_name}")
+        with col2:
+            if st.button("💰 Check Balance", type="primary"):
+                balance_info = get_previous_contact_balance_info(old_id, creds)
+                if balance_info:
+                    # Formatted once here rather than on every rerun that shows it
+                    outstanding_str = f"${balance_info['outstanding']:.2f}"
+                    action = 'Keep Active' if balance_info['has_balance'] else 'Set Inactive'
+                    st.session_state.previous_contact_balance = {
+                        **balance_info,
+                        'outstanding_str': outstanding_str,
+                        'status_text': f"Balance: {outstanding_str} - {action}"
+                    }
+                    st.rerun()
+                else:
+                    st.error("❌ Failed to get balance information")
+
+    # UPDATED: Show TWO button options if balance is available
+    if st.session_state.previous_contact_balance and not st.session_state.invoice_splitting_mode:
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            st.write(st.session_state.previous_contact_balance['status_text'])
+        with col2:
+            if st.button("🔄 Assign /P group", type="primary"):
+                result = handle_previous_contact_workflow(old_id, creds)
+
+                if _previous_contact_done(result):
+                    st.success("✅ Previous contact workflow completed successfully!")
+                    st.session_state.previous_contact_processed = True
+                    st.rerun()
+                else:
+                    error_msg = result.get('error', 'Unknown error')
+                    st.error(f"❌ Workflow reported failure: {error_msg}")
+
+        with col3:
+            if st.button("✂️ Split Invoice", type="secondary"):
+                # Start invoice splitting workflow
+                st.session_state.invoice_splitting_mode = True
+
+                # Get latest invoice for splitting
+                invoice = get_invoice_for_splitting(old_id, creds)
+                if invoice:
+                    # Parsed once as exact currency; the split workflow reruns many times
+                    st.session_state.split_invoice_amounts = (
+                        Decimal(str(invoice.get('Total', 0))),
+                        Decimal(str(invoice.get('AmountDue', 0))),
+                    )
+                    st.session_state.invoice_to_split = invoice
+                    st.rerun()
+                else:
+                    st.error("❌ No unpaid invoice found for splitting")
+
+@st.fragment
+def _section_summary(old_view: ContactView, new_view: ContactView):
+    """Workflow progress banner, summary and restart button (reruns on its own)."""
+    ss = st.session_state
+    processed = bool(ss.previous_contact_processed)
+    balance_info = ss.previous_contact_balance
+    
+    # Only show completion message if previous contact was actually processed
+    if processed:
+        st.markdown("---")
+        st.success("🎉 **Workflow Complete!** All steps finished successfully.")
+    else:
+        # Show what's been completed so far
+        st.markdown("---")
+        st.info("📋 **Workflow In Progress** - Complete the previous contact step above to finish.")
+    
+    # Always show comprehensive summary of what's been done
+    summary_fields = (
+        old_view.name, old_view.account_number,
+        new_view.name, new_view.account_number,
+        len(ss.found_invoices) + ss.reassigned_invoice_count,
+        ss.reassigned_invoice_count,
+        len(ss.selected_invoices),
+        ss.template_search_performed,
+        ss.template_ref_display,
+        balance_info['outstanding_str'] if balance_info else None,
+        balance_info['has_balance'] if balance_info else False,
+        ss.split_executed,
+        processed
+    )
+    
+    # Reuse last rerun's blob while the fields are unchanged. The element is
+    # still emitted every run, since Streamlit drops anything not re-sent.
+    if ss.summary_cache is None or ss.summary_cache[0] != summary_fields:
+        ss.summary_cache = (summary_fields, _summary_markdown(*summary_fields))
+    summary = ss.summary_cache[1]
+    
+    # Collapsed until the workflow is done; bullets and final status are a single element
+    with st.expander("📋 **Workflow Summary**", expanded=processed):
+        st.markdown(f"{summary}\n\n{_FINAL_STATUS[processed]}")
+    
+    # Add restart option
+    st.markdown("---")
+    if st.button(_RESTART_LABEL[processed], type="primary", use_container_width=True):
+        _reset_workflow()
+        st.rerun()
+
 # Main Streamlit App
 def main():
     # Logo container with styling
@@ -618,6 +1300,10 @@ def main():
     # Main header
     st.title("Xero New Occupier Manager")
     
+    # Connect on page load so the first search doesn't also pay for TLS, token and tenant lookup
+    if not st.session_state.authenticated:
+        authenticate_xero()
+    
     # Status indicator
     col1, col2, col3 = st.columns([2, 1, 1])
     with col1:
@@ -629,17 +1315,8 @@ def main():
             st.warning("🟡 Not connected")
     with col3:
         if st.button("🔄 Reset", type="secondary"):
-            # Updated to include invoice splitting variables
-            keys_to_clear = [
-                'existing_contact', 'search_performed', 'new_contact', 'found_invoices', 
-                'selected_invoices', 'found_repeating_templates', 'previous_contact_balance', 
-                'previous_contact_processed', 'contact_validation_result', 'selected_contact_option',
-                'invoice_splitting_mode', 'invoice_to_split', 'split_calculation', 'split_executed',
-                'vacate_date', 'move_in_date'
-            ]
-            for key in keys_to_clear:
-                if key in st.session_state:
-                    del st.session_state[key]
+            # This session's workflow only; the shared manager and lookup caches serve every session
+            _reset_workflow()
             st.rerun()
 
     st.markdown("---")
@@ -656,8 +1333,8 @@ def main():
     
     # Handle search
     if search_clicked and account_number:
-        account_number = account_number.strip().upper()
-        if len(account_number) != 8 and not validate_account_number(account_number):
+        account_number, is_valid = _normalize_and_validate(account_number)
+        if not is_valid:
             st.error("❌ Invalid account number format")
         else:
             contact = search_contact(account_number)
@@ -673,552 +1350,191 @@ def main():
     # ============================================================================
     
     if st.session_state.existing_contact:
-        st.markdown("---")
-        
-        # Compact form layout
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            contact_codes = list(CONTACT_CODES.keys())
-            contact_codes.sort()
-            selected_code = st.selectbox("Contact Code *", options=contact_codes, index=None, placeholder="Choose...")
-        
-        with col2:
-            first_name = st.text_input("First Name *", value="Occupier", placeholder="Enter first name")
-        
-        with col3:
-            last_name = st.text_input("Last Name", placeholder="Enter last name")
-        
-        with col4:
-            email = st.text_input("Email", placeholder="Enter email")
-        
-        # Show contact creation status
-        if st.session_state.new_contact:
-            st.success(f"✅ Contact created: {st.session_state.new_contact.get('Name', 'Unknown')} ({st.session_state.new_contact.get('AccountNumber', 'N/A')})")
-        
-        # Real-time validation when contact code is selected (but NOT if contact already created)
-        if selected_code and not st.session_state.new_contact:
-            if st.session_state.contact_validation_result is None or \
-               st.session_state.contact_validation_result.get('contact_code') != selected_code:
-                
-                # Validate the contact creation
-                validation_result = validate_contact_creation(st.session_state.existing_contact, selected_code)
-                
-                if validation_result:
-                    validation_result['contact_code'] = selected_code  # Store which code was validated
-                    st.session_state.contact_validation_result = validation_result
-                    # Reset option selection when validation changes
-                    st.session_state.selected_contact_option = None
-                    st.rerun()
-        
-        # Show validation results (only if no contact created yet)
-        if st.session_state.contact_validation_result and not st.session_state.new_contact:
-            validation = st.session_state.contact_validation_result
-            
-            if validation['status'] == 'available':
-                st.success(f"✅ {validation['message']}")
-                
-            elif validation['status'] == 'duplicate_found':
-                st.warning(f"⚠️ {validation['message']}")
-                
-                # Show options for duplicate resolution
-                st.markdown("**Choose how to proceed:**")
-                
-                for i, option in enumerate(validation['options']):
-                    option_key = f"option_{i}"
-                    
-                    if option['type'] == 'use_existing':
-                        if st.button(f"📋 Use existing contact: {option['account_number']}", 
-                                   key=option_key, use_container_width=True):
-                            st.session_state.selected_contact_option = option
-                            st.rerun()
-                            
-                    elif option['type'] == 'create_next':
-                        if st.button(f"🆕 Create new contact: {option['account_number']}", 
-                                   key=option_key, use_container_width=True):
-                            st.session_state.selected_contact_option = option
-                            st.rerun()
-                            
-                    elif option['type'] == 'no_available':
-                        st.error("❌ No sequential numbers available - please choose a different contact code")
-                
-            elif validation['status'] == 'error':
-                st.error(f"❌ {validation['message']}")
-        
-        # Show selected option and create button (only if no contact created yet)
-        if st.session_state.selected_contact_option and not st.session_state.new_contact:
-            selected_option = st.session_state.selected_contact_option
-            
-            if selected_option['type'] == 'use_existing':
-                st.info(f"📋 **Selected:** Use existing contact {selected_option['account_number']}")
-            elif selected_option['type'] == 'create_next':
-                st.info(f"🆕 **Selected:** Create new contact {selected_option['account_number']}")
-            
-            # Validation and create button
-            can_create = bool(selected_code and first_name.strip())
-            
-            if can_create:
-                if st.button("✅ Proceed with Selected Option", type="primary"):
-                    new_contact_data = {
-                        'contact_code': selected_code,
-                        'first_name': first_name.strip(),
-                        'last_name': last_name.strip(),
-                        'email': email.strip()
-                    }
-                    
-                    new_contact = handle_contact_creation_with_option(new_contact_data, selected_option)
-                    if new_contact:
-                        if selected_option['type'] == 'use_existing':
-                            st.success(f"✅ Using existing contact: {new_contact.get('Name', 'Unknown')}")
-                        else:
-                            st.success(f"✅ Created new contact: {new_contact.get('Name', 'Unknown')}")
-                        
-                        # Clear validation state for next time
-                        st.session_state.contact_validation_result = None
-                        st.session_state.selected_contact_option = None
-            else:
-                missing = []
-                if not selected_code:
-                    missing.append("Contact Code")
-                if not first_name.strip():
-                    missing.append("First Name")
-                st.warning(f"⚠️ Please provide: {', '.join(missing)}")
-        
-        elif selected_code and st.session_state.contact_validation_result and \
-             st.session_state.contact_validation_result['status'] == 'available' and \
-             not st.session_state.new_contact:
-            # Normal creation path for available contacts
-            can_create = bool(selected_code and first_name.strip())
-            
-            if can_create:
-                if st.button("🆕 Create New Contact", type="primary"):
-                    new_contact_data = {
-                        'contact_code': selected_code,
-                        'first_name': first_name.strip(),
-                        'last_name': last_name.strip(),
-                        'email': email.strip()
-                    }
-                    
-                    new_contact = create_new_contact(new_contact_data)
-                    if new_contact:
-                        st.success(f"✅ Created: {new_contact.get('Name', 'Unknown')}")
-                        
-                        # Clear validation state for next time
-                        st.session_state.contact_validation_result = None
+        _section_create()
+    
+    # Bind both contacts once; every section below needs them
+    old = st.session_state.existing_contact
+    new = st.session_state.new_contact
+    old_view, new_view = _contact_view(old), _contact_view(new)
+    
+    # Sections 3 onwards (including splitting and the summary) need both contacts
+    if not (new and old):
+        return
     
     # ============================================================================
     # SECTION 3: Invoice Reassignment (only show if new contact created)
     # ============================================================================
     
-    if st.session_state.new_contact and st.session_state.existing_contact:
-        st.markdown("---")
-        
-        # Compact invoice search
-        col1, col2 = st.columns([2, 1])
-        with col1:
-            move_in_date = st.date_input("Move-in Date", value=date.today())
-        with col2:
-            if st.button("🔍 Find Invoices", type="primary"):
-                old_contact_id = st.session_state.existing_contact.get('ContactID')
-                if old_contact_id:
-                    invoices = search_invoices_for_old_contact(old_contact_id, move_in_date)
-                    if invoices:
-                        st.success(f"✅ Found {len(invoices)} invoices")
-                    else:
-                        st.info("No invoices found")
-        
-        # Display invoices compactly
-        if st.session_state.found_invoices:
-            selected_for_reassignment = []
-            
-            # Compact invoice list
-            for i, invoice in enumerate(st.session_state.found_invoices):
-                invoice_id = invoice.get('InvoiceID', '')
-                invoice_number = invoice.get('InvoiceNumber', 'N/A')
-                total = invoice.get('Total', 0)
-                status = invoice.get('Status', 'N/A')
-                
-                col1, col2, col3, col4 = st.columns([1, 2, 2, 1])
-                
-                with col1:
-                    is_selected = st.checkbox("Select", key=f"inv_{i}", value=invoice_id in st.session_state.selected_invoices, label_visibility="collapsed")
-                    if is_selected:
-                        selected_for_reassignment.append(invoice_id)
-                
-                with col2:
-                    st.write(f"**{invoice_number}**")
-                
-                with col3:
-                    st.write(f"${float(total):.2f}")
-                
-                with col4:
-                    st.write(f"{status}")
-            
-            st.session_state.selected_invoices = selected_for_reassignment
-            
-            # Reassign button
-            if selected_for_reassignment:
-                if st.button(f"🔄 Reassign {len(selected_for_reassignment)} Invoices", type="primary"):
-                    new_contact_id = st.session_state.new_contact.get('ContactID')
-                    if new_contact_id:
-                        successful, failed = reassign_invoices(selected_for_reassignment, new_contact_id)
-                        if successful:
-                            st.success(f"✅ Reassigned {len(successful)} invoices")
-                            st.session_state.selected_invoices = []
+    _section_invoices(old_view.id, new_view.id)
     
     # ============================================================================
     # SECTION 4: Repeating Invoice Template (compact)
     # ============================================================================
     
-    if st.session_state.new_contact and st.session_state.existing_contact:
-        st.markdown("---")
-        
-        col1, col2 = st.columns([2, 1])
-        with col1:
-            st.write("**Repeating Invoice Template:**")
-        with col2:
-            if st.button("🔍 Find Template", type="primary"):
-                old_contact_id = st.session_state.existing_contact.get('ContactID')
-                if old_contact_id:
-                    templates = search_repeating_invoices_for_old_contact(old_contact_id)
-                    if templates:
-                        st.success(f"✅ Found template")
-                    else:
-                        st.info("No template found")
-        
-        # Handle template reassignment
-        if st.session_state.found_repeating_templates:
-            template = st.session_state.found_repeating_templates[0]
-            reference = template.get('Reference', 'N/A')
-            st.write(f"Template: {reference}")
-            
-            if st.button("🔄 Reassign Template", type="primary"):
-                old_contact_id = st.session_state.existing_contact.get('ContactID')
-                new_contact_id = st.session_state.new_contact.get('ContactID')
-                if old_contact_id and new_contact_id:
-                    result = reassign_repeating_invoice_template(old_contact_id, new_contact_id)
-                    if result.get('success'):
-                        st.success("✅ Template reassigned")
-                        st.session_state.found_repeating_templates = []
+    _section_template(old_view.id, new_view.id)
     
     # ============================================================================
     # SECTION 5: Previous Contact Management (UPDATED: Two button options)
     # ============================================================================
     
-    if st.session_state.new_contact and st.session_state.existing_contact and not st.session_state.previous_contact_processed:
-        st.markdown("---")
-        
-        # Balance check
-        if not st.session_state.previous_contact_balance:
-            col1, col2 = st.columns([2, 1])
-            with col1:
-                old_contact_name = st.session_state.existing_contact.get('Name', 'Unknown')
-                st.write(f"**Previous Contact:** {old_contact_name}")
-            with col2:
-                if st.button("💰 Check Balance", type="primary"):
-                    old_contact_id = st.session_state.existing_contact.get('ContactID')
-                    if old_contact_id:
-                        balance_info = get_previous_contact_balance_info(old_contact_id)
-                        if balance_info:
-                            st.session_state.previous_contact_balance = balance_info
-                            st.rerun()
-                        else:
-                            st.error("❌ Failed to get balance information")
-        
-        # UPDATED: Show TWO button options if balance is available
-        if st.session_state.previous_contact_balance and not st.session_state.invoice_splitting_mode:
-            balance_info = st.session_state.previous_contact_balance
-            outstanding = balance_info['outstanding']
-            has_balance = balance_info['has_balance']
-            
-            col1, col2, col3 = st.columns([2, 1, 1])
-            with col1:
-                status_text = f"Balance: ${outstanding:.2f} - {'Keep Active' if has_balance else 'Set Inactive'}"
-                st.write(status_text)
-            with col2:
-                if st.button("🔄 Assign /P group", type="primary"):
-                    old_contact_id = st.session_state.existing_contact.get('ContactID')
-                    result = handle_previous_contact_workflow(old_contact_id)
-                    
-                    if result.get('success') or result.get('added_to_previous_group'):
-                        st.success("✅ Previous contact workflow completed successfully!")
-                        st.session_state.previous_contact_processed = True
-                        st.rerun()
-                    else:
-                        error_msg = result.get('error', 'Unknown error')
-                        st.error(f"❌ Workflow reported failure: {error_msg}")
-            
-            with col3:
-                if st.button("✂️ Split Invoice", type="secondary"):
-                    # Start invoice splitting workflow
-                    st.session_state.invoice_splitting_mode = True
-                    old_contact_id = st.session_state.existing_contact.get('ContactID')
-                    
-                    # Get latest invoice for splitting
-                    invoice = get_invoice_for_splitting(old_contact_id)
-                    if invoice:
-                        st.session_state.invoice_to_split = invoice
-                        st.rerun()
-                    else:
-                        st.error("❌ No unpaid invoice found for splitting")
+    if not st.session_state.previous_contact_processed:
+        _section_previous(old_view.id, old_view.name)
     
     # ============================================================================
     # NEW SECTION: Invoice Splitting Workflow
     # ============================================================================
     
     if st.session_state.invoice_splitting_mode and st.session_state.invoice_to_split:
-        st.markdown("---")
-        st.markdown("## ✂️ **Invoice Splitting Workflow**")
-        
-        invoice = st.session_state.invoice_to_split
-        invoice_number = invoice.get('InvoiceNumber', 'N/A')
-        invoice_total = float(invoice.get('Total', 0))
-        amount_due = float(invoice.get('AmountDue', 0))
-        
-        # Display invoice being split
-        st.info(f"**Splitting Invoice:** {invoice_number} - Total: £{invoice_total:.2f} (Due: £{amount_due:.2f})")
+        # Drawn into a placeholder so it can be cleared in place once finished
+        split_slot = st.empty()
+        split_finished = False
         
-        # Date input section
-        if not st.session_state.split_calculation:
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                vacate_date = st.date_input("Previous Occupier Vacate Date:", 
-                                          value=st.session_state.vacate_date or date.today(),
-                                          key="vacate_date_input")
-                st.session_state.vacate_date = vacate_date
-            
-            with col2:
-                move_in_date = st.date_input("New Occupier Move-in Date:", 
-                                           value=st.session_state.move_in_date or date.today(),
-                                           key="move_in_date_input")
-                st.session_state.move_in_date = move_in_date
-            
-            # Calculate split button
-            if st.button("🧮 Calculate Split", type="primary"):
-                if vacate_date and move_in_date:
-                    contact_data = st.session_state.existing_contact
-                    split_result = calculate_split(invoice, contact_data, vacate_date, move_in_date)
-                    
-                    if split_result and split_result.get('success'):
-                        st.session_state.split_calculation = split_result
-                        st.rerun()
-                    else:
-                        error_msg = split_result.get('error', 'Unknown error') if split_result else 'Calculation failed'
-                        st.error(f"❌ Split calculation failed: {error_msg}")
-                else:
-                    st.error("❌ Please enter both dates")
-        
-        # Display calculation results
-        if st.session_state.split_calculation and not st.session_state.split_executed:
-            split_calc = st.session_state.split_calculation['split_calculation']
-            
-            st.markdown("### 📊 **Split Calculation Results**")
-            
-            # Previous occupier details
-            prev_data = split_calc['previous_occupier']
-            st.success(f"**Previous Occupier:** {prev_data['days']} days = £{prev_data['amount']:.1f}")
-            st.write(f"Period: {prev_data['period']}")
-            
-            # New occupier details  
-            new_data = split_calc['new_occupier']
-            st.success(f"**New Occupier:** {new_data['days']} days = £{new_data['amount']:.1f}")
-            st.write(f"Period: {new_data['period']}")
-            
-            # Void period details
-            void_data = split_calc['void_period']
-            if void_data['days'] > 0:
-                st.warning(f"**Void Period:** {void_data['days']} days = £{void_data['amount']:.1f} (written off)")
-                st.write(f"Period: {void_data['period']}")
-            else:
-                st.info("**No void period** (occupiers transitioned on same day)")
+        with split_slot.container():
+            st.markdown("---")
+            st.markdown("## ✂️ **Invoice Splitting Workflow**")
             
-            # Action buttons
-            st.markdown("### 🚀 **Execute Split Actions**")
+            invoice = st.session_state.invoice_to_split
+            invoice_number = invoice.get('InvoiceNumber', 'N/A')
+            total, amount_due = st.session_state.split_invoice_amounts
             
-            col1, col2, col3 = st.columns([1, 1, 1])
+            # Display invoice being split
+            st.info(f"**Splitting Invoice:** {invoice_number} - Total: £{total:.2f} (Due: £{amount_due:.2f})")
             
-            with col1:
-                if st.button("📝 Adjust Previous Invoice", type="primary", use_container_width=True):
-                    # Execute the split
-                    new_contact_id = st.session_state.new_contact.get('ContactID')
-                    split_result = execute_split(invoice, new_contact_id, st.session_state.split_calculation)
-                    
-                    if split_result and split_result.get('success'):
-                        st.success("✅ Invoice split executed successfully!")
-                        st.write(f"• Adjusted previous invoice to: £{split_result['previous_amount']:.1f}")
-                        st.write(f"• Created new invoice for: £{split_result['new_amount']:.1f}")
-                        st.session_state.split_executed = True
-                        st.rerun()
+            # Date input section
+            if not st.session_state.split_calculation:
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    vacate_date = st.date_input("Previous Occupier Vacate Date:", 
+                                              value=st.session_state.vacate_date or date.today(),
+                                              key="vacate_date_input")
+                    st.session_state.vacate_date = vacate_date
+                
+                with col2:
+                    move_in_date = st.date_input("New Occupier Move-in Date:", 
+                                               value=st.session_state.move_in_date or date.today(),
+                                               key="move_in_date_input")
+                    st.session_state.move_in_date = move_in_date
+                
+                # Calculate split button
+                if st.button("🧮 Calculate Split", type="primary"):
+                    if vacate_date and move_in_date:
+                        split_result = calculate_split(invoice, old, vacate_date, move_in_date)
+                        
+                        if split_result and split_result.get('success'):
+                            st.session_state.split_calculation = split_result
+                            st.rerun()
+                        else:
+                            error_msg = split_result.get('error', 'Unknown error') if split_result else 'Calculation failed'
+                            st.error(f"❌ Split calculation failed: {error_msg}")
                     else:
-                        error_msg = split_result.get('error', 'Unknown error') if split_result else 'Split execution failed'
-                        st.error(f"❌ Split execution failed: {error_msg}")
-            
-            with col2:
-                if st.button("❌ Cancel Split", type="secondary", use_container_width=True):
-                    # Cancel and return to previous contact management
-                    st.session_state.invoice_splitting_mode = False
-                    st.session_state.invoice_to_split = None
-                    st.session_state.split_calculation = None
-                    st.session_state.split_executed = False
-                    st.rerun()
+                        st.error("❌ Please enter both dates")
             
-            with col3:
-                if st.button("🔄 Recalculate", type="secondary", use_container_width=True):
-                    # Clear calculation to allow new dates
-                    st.session_state.split_calculation = None
-                    st.rerun()
-        
-        # Show completion and return to handle workflow
-        if st.session_state.split_executed:
-            st.success("🎉 **Invoice splitting completed successfully!**")
-            st.info("You can now complete the previous contact workflow.")
-            
-            col1, col2 = st.columns([1, 1])
-            
-            with col1:
-                if st.button("🔄 Complete Previous Contact Workflow", type="primary", use_container_width=True):
-                    # Now execute the handle workflow
-                    old_contact_id = st.session_state.existing_contact.get('ContactID')
-                    result = handle_previous_contact_workflow(old_contact_id)
-                    
-                    if result.get('success') or result.get('added_to_previous_group'):
-                        st.success("✅ Previous contact workflow completed successfully!")
-                        st.session_state.previous_contact_processed = True
-                        # Clear splitting state
+            # Display calculation results
+            if st.session_state.split_calculation and not st.session_state.split_executed:
+                split_calc = st.session_state.split_calculation['split_calculation']
+                
+                st.markdown("### 📊 **Split Calculation Results**")
+                
+                # Previous occupier details
+                prev_data = split_calc['previous_occupier']
+                st.success(f"**Previous Occupier:** {prev_data['days']} days = £{prev_data['amount']:.1f}")
+                st.write(f"Period: {prev_data['period']}")
+                
+                # New occupier details  
+                new_data = split_calc['new_occupier']
+                st.success(f"**New Occupier:** {new_data['days']} days = £{new_data['amount']:.1f}")
+                st.write(f"Period: {new_data['period']}")
+                
+                # Void period details
+                void_data = split_calc['void_period']
+                if void_data['days'] > 0:
+                    st.warning(f"**Void Period:** {void_data['days']} days = £{void_data['amount']:.1f} (written off)")
+                    st.write(f"Period: {void_data['period']}")
+                else:
+                    st.info("**No void period** (occupiers transitioned on same day)")
+                
+                # Action buttons
+                st.markdown("### 🚀 **Execute Split Actions**")
+                
+                col1, col2, col3 = st.columns([1, 1, 1])
+                
+                with col1:
+                    if st.button("📝 Adjust Previous Invoice", type="primary", use_container_width=True):
+                        # Execute the split
+                        split_result = execute_split(invoice, new_view.id, st.session_state.split_calculation)
+                        
+                        if split_result and split_result.get('success'):
+                            st.success("✅ Invoice split executed successfully!")
+                            st.markdown(
+                                f"- Adjusted previous invoice to: £{split_result['previous_amount']:.1f}\n"
+                                f"- Created new invoice for: £{split_result['new_amount']:.1f}"
+                            )
+                            st.session_state.split_executed = True
+                            st.rerun()
+                        else:
+                            error_msg = split_result.get('error', 'Unknown error') if split_result else 'Split execution failed'
+                            st.error(f"❌ Split execution failed: {error_msg}")
+                
+                with col2:
+                    if st.button("❌ Cancel Split", type="secondary", use_container_width=True):
+                        # Cancel and return to previous contact management
                         st.session_state.invoice_splitting_mode = False
                         st.session_state.invoice_to_split = None
+                        st.session_state.split_invoice_amounts = None
                         st.session_state.split_calculation = None
                         st.session_state.split_executed = False
                         st.rerun()
-                    else:
-                        error_msg = result.get('error', 'Unknown error')
-                        st.error(f"❌ Workflow reported failure: {error_msg}")
+                
+                with col3:
+                    if st.button("🔄 Recalculate", type="secondary", use_container_width=True):
+                        # Clear calculation to allow new dates
+                        st.session_state.split_calculation = None
+                        st.rerun()
             
-            with col2:
-                if st.button("🆕 Start New Workflow", type="secondary", use_container_width=True):
-                    # Reset everything
-                    keys_to_clear = [
-                        'existing_contact', 'search_performed', 'new_contact', 'found_invoices', 
-                        'selected_invoices', 'found_repeating_templates', 'previous_contact_balance', 
-                        'previous_contact_processed', 'contact_validation_result', 'selected_contact_option',
-                        'invoice_splitting_mode', 'invoice_to_split', 'split_calculation', 'split_executed',
-                        'vacate_date', 'move_in_date'
-                    ]
-                    for key in keys_to_clear:
-                        if key in st.session_state:
-                            del st.session_state[key]
-                    st.rerun()
+            # Show completion and return to handle workflow
+            if st.session_state.split_executed:
+                st.success("🎉 **Invoice splitting completed successfully!**")
+                st.info("You can now complete the previous contact workflow.")
+                
+                col1, col2 = st.columns([1, 1])
+                
+                with col1:
+                    if st.button("🔄 Complete Previous Contact Workflow", type="primary", use_container_width=True):
+                        # Now execute the handle workflow
+                        result = handle_previous_contact_workflow(old_view.id)
+                        
+                        if _previous_contact_done(result):
+                            st.success("✅ Previous contact workflow completed successfully!")
+                            st.session_state.previous_contact_processed = True
+                            # Clear splitting state
+                            st.session_state.invoice_splitting_mode = False
+                            st.session_state.invoice_to_split = None
+                            st.session_state.split_invoice_amounts = None
+                            st.session_state.split_calculation = None
+                            st.session_state.split_executed = False
+                            # The summary below reads the updated state in this same run
+                            split_finished = True
+                        else:
+                            error_msg = result.get('error', 'Unknown error')
+                            st.error(f"❌ Workflow reported failure: {error_msg}")
+                
+                with col2:
+                    if st.button("🆕 Start New Workflow", type="secondary", use_container_width=True):
+                        # Reset everything
+                        _reset_workflow()
+                        st.rerun()
+        
+        if split_finished:
+            split_slot.empty()
     
     # ============================================================================
     # WORKFLOW SUMMARY (Updated to include splitting workflow)
     # ============================================================================
     
     # Show workflow summary when new contact is created (but not when in splitting mode)
-    if (st.session_state.new_contact and st.session_state.existing_contact and 
-        not st.session_state.invoice_splitting_mode):
-        
-        # Only show completion message if previous contact was actually processed
-        if st.session_state.previous_contact_processed:
-            st.markdown("---")
-            st.success("🎉 **Workflow Complete!** All steps finished successfully.")
-        else:
-            # Show what's been completed so far
-            st.markdown("---")
-            st.info("📋 **Workflow In Progress** - Complete the previous contact step above to finish.")
-        
-        # Always show comprehensive summary of what's been done
-        st.markdown("### 📋 **Workflow Summary**")
-        
-        # 1. Contact Creation Summary
-        if st.session_state.existing_contact and st.session_state.new_contact:
-            st.markdown("**1️⃣ Contact Creation:**")
-            original_name = st.session_state.existing_contact.get('Name', 'Unknown')
-            original_account = st.session_state.existing_contact.get('AccountNumber', 'N/A')
-            new_name = st.session_state.new_contact.get('Name', 'Unknown')
-            new_account = st.session_state.new_contact.get('AccountNumber', 'N/A')
-            
-            st.write(f"• ✅ **Found existing contact:** {original_name} ({original_account})")
-            st.write(f"• ✅ **Created new contact:** {new_name} ({new_account})")
-        
-        # 2. Invoice Reassignment Summary
-        st.markdown("**2️⃣ Invoice Reassignment:**")
-        if st.session_state.found_invoices:
-            total_found = len(st.session_state.found_invoices)
-            st.write(f"• ✅ **Found {total_found} invoices** for potential reassignment")
-            
-            # Check if any invoices were actually reassigned
-            if len(st.session_state.selected_invoices) == 0:
-                # Invoices were likely reassigned (selected_invoices gets cleared after reassignment)
-                st.write(f"• ✅ **Successfully reassigned invoices** from old to new contact")
-            else:
-                st.write(f"• ℹ️ **{len(st.session_state.selected_invoices)} invoices still selected** (not yet reassigned)")
-        else:
-            st.write("• ℹ️ **No invoices found** for reassignment")
-        
-        # 3. Template Reassignment Summary
-        st.markdown("**3️⃣ Repeating Invoice Template:**")
-        if st.session_state.template_search_performed:
-            if st.session_state.found_repeating_templates:
-                # Check if templates list is empty (would mean it was reassigned and cleared)
-                if len(st.session_state.found_repeating_templates) == 0:
-                    st.write(f"• ✅ **Template found and reassigned** from old to new contact")
-                else:
-                    template = st.session_state.found_repeating_templates[0]
-                    template_ref = template.get('Reference', 'N/A')
-                    st.write(f"• ✅ **Found template:** {template_ref}")
-                    st.write(f"• ⚠️ **Template may not have been reassigned yet**")
-            else:
-                st.write("• ℹ️ **No repeating invoice template** found")
-        else:
-            st.write("• ⚠️ **Template search not performed**")
-        
-        # 4. Previous Contact Handling Summary (UPDATED to include splitting)
-        st.markdown("**4️⃣ Previous Contact Management:**")
-        if st.session_state.previous_contact_balance:
-            balance_info = st.session_state.previous_contact_balance
-            outstanding = balance_info['outstanding']
-            has_balance = balance_info['has_balance']
-            old_name = st.session_state.existing_contact.get('Name', 'Unknown')
-            
-            st.write(f"• ✅ **Checked balance:** ${outstanding:.2f} outstanding")
-            
-            # Show splitting status if it was used
-            if st.session_state.split_executed:
-                st.write(f"• ✅ **Invoice splitting completed** - split invoice between occupiers")
-            
-            if st.session_state.previous_contact_processed:
-                if has_balance:
-                    st.write(f"• ✅ **Set to ACTIVE + /P code** (has outstanding balance)")
-                else:
-                    st.write(f"• ✅ **Set to INACTIVE + /P code** (zero balance)")
-                    
-                st.write(f"• ✅ **Moved to contact group:** '+ Previous accounts still due'")
-                st.write(f"• ✅ **Previous contact processed:** {old_name}")
-        
-        # 5. Final Status
-        if st.session_state.previous_contact_processed:
-            st.markdown("**✅ All modules completed successfully!**")
-        else:
-            st.markdown("**⚠️ Previous contact step still pending** - Complete Section 5 above to finish")
-        
-        # Add restart option
-        st.markdown("---")
-        col1, col2, col3 = st.columns([1, 1, 1])
-        with col2:
-            button_text = "🆕 Start New Workflow" if st.session_state.previous_contact_processed else "🔄 Reset Current Workflow"
-            if st.button(button_text, type="primary", use_container_width=True):
-                keys_to_clear = [
-                    'existing_contact', 'search_performed', 'new_contact', 'found_invoices', 
-                    'selected_invoices', 'found_repeating_templates', 'previous_contact_balance', 
-                    'previous_contact_processed', 'contact_validation_result', 'selected_contact_option',
-                    'invoice_splitting_mode', 'invoice_to_split', 'split_calculation', 'split_executed',
-                    'vacate_date', 'move_in_date'
-                ]
-                for key in keys_to_clear:
-                    if key in st.session_state:
-                        del st.session_state[key]
-                st.rerun()
+    if not st.session_state.invoice_splitting_mode:
+        _section_summary(old_view, new_view)
 
 if __name__ == "__main__":
     if check_password():
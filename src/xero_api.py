@@ -0,0 +1,416 @@
+"""
+Xero API - Shared Helpers
+=========================
+
+This module holds helpers shared by the Xero manager modules:
+- a pooled HTTP session so repeated API calls reuse TCP/TLS connections
+- a small disk-backed cache for client-credentials access tokens so the CLI
+  scripts can skip the OAuth handshake while the previous token is still
+  valid (opt-in for XeroContactManager; the Streamlit app keeps tokens in memory)
+- detection of 401s from the accounting API, so a long-lived shared client
+  knows to re-authenticate
+- get_access_token / get_tenant_id for scripts that just need working
+  credentials, backed by the token cache
+- conditional GETs (ETag / If-None-Match) so repeat searches for the same
+  data get a 304 instead of re-downloading the JSON body
+"""
+
+import os
+import json
+import time
+import logging
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional, Any, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Optional: orjson parses the large contact/invoice lists several times faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Token cache location; one entry per (client_id, scope)
+TOKEN_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'xero', 'token.json')
+
+# Treat tokens this close to expiry as already expired
+TOKEN_EXPIRY_MARGIN = 30
+
+TOKEN_URL = 'https://identity.xero.com/connect/token'
+CONNECTIONS_URL = 'https://api.xero.com/connections'
+DEFAULT_SCOPE = 'accounting.contacts'
+
+# Xero allows at most 5 concurrent calls per tenant. The pooled session holds one
+# slot per in-flight request, so every thread pool sharing it stays within the limit.
+MAX_CONCURRENT_CALLS = 5
+
+# GET responses kept for ETag revalidation, bounded by count and by total body size
+ETAG_CACHE_SIZE = 64
+ETAG_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+# Rate limiting: rate-limited calls are retried after Retry-After (clamped to
+# 1-60s, so a day-limit 429 can't park a thread for hours), and calls pause
+# briefly when the per-minute allowance is nearly spent
+RETRY_AFTER_MAX = 60
+MIN_LIMIT_FLOOR = 3
+MIN_LIMIT_PAUSE = 2
+
+_http_session = None
+_http_session_lock = threading.Lock()
+_call_slots = threading.BoundedSemaphore(MAX_CONCURRENT_CALLS)
+_unauthorized = False
+_unauthorized_lock = threading.Lock()
+
+# Raw bodies are stored, not parsed objects, so every caller gets its own copy
+_etag_cache: "OrderedDict[Tuple[Any, ...], Tuple[str, bytes]]" = OrderedDict()
+_etag_cache_bytes = 0
+_etag_cache_lock = threading.Lock()
+
+
+class _ClampedRetry(Retry):
+    """
+    urllib3 Retry that honours Retry-After but never waits longer than RETRY_AFTER_MAX.
+    
+    POSTs aren't idempotent, so they are not retried on gateway errors (a 502
+    may have been applied). A 429 means Xero rejected the request outright,
+    so POSTs are retried on that status too.
+    """
+    
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method == 'POST' and status_code == 429:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+    
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(max(retry_after, 1), RETRY_AFTER_MAX)
+
+
+class _ConcurrencyLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that holds one of the MAX_CONCURRENT_CALLS slots for each request it sends."""
+    
+    def send(self, request, *args, **kwargs):
+        with _call_slots:
+            return super().send(request, *args, **kwargs)
+
+
+def get_http_session() -> requests.Session:
+    """
+    Get the process-wide pooled session used for all Xero API calls.
+    
+    Transient gateway errors and 429s are retried with backoff (honouring
+    Retry-After, capped at RETRY_AFTER_MAX seconds); POSTs only on a 429
+    (see _ClampedRetry). At most MAX_CONCURRENT_CALLS requests are in
+    flight at once across all threads using the session.
+    
+    Returns:
+        requests.Session: Shared session with a connection pool mounted
+    """
+    global _http_session
+    
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                # raise_on_status=False: once retries run out the caller gets the
+                # 429/5xx response to check, not a RetryError
+                retry = _ClampedRetry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504],
+                                      raise_on_status=False)
+                adapter = _ConcurrencyLimitedAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.hooks['response'].extend([_respect_rate_limits, _note_unauthorized])
+                _http_session = session
+    
+    return _http_session
+
+
+def _respect_rate_limits(response: requests.Response, *args, **kwargs) -> None:
+    """
+    Response hook that slows callers down as Xero's per-minute allowance runs out.
+    
+    429s themselves are retried by the session's _ClampedRetry; this only adds
+    a short pause once X-MinLimit-Remaining drops below MIN_LIMIT_FLOOR.
+    """
+    remaining = response.headers.get('X-MinLimit-Remaining', '')
+    if remaining.isdigit() and int(remaining) < MIN_LIMIT_FLOOR:
+        logger.warning("Xero minute limit nearly reached (%s left), pausing %ss", remaining, MIN_LIMIT_PAUSE)
+        time.sleep(MIN_LIMIT_PAUSE)
+
+
+def _note_unauthorized(response: requests.Response, *args, **kwargs) -> None:
+    """Response hook that records a 401 from the accounting API (expired or revoked token)."""
+    global _unauthorized
+    if response.status_code == 401 and response.url.startswith('https://api.xero.com/'):
+        with _unauthorized_lock:
+            _unauthorized = True
+
+
+def take_unauthorized() -> bool:
+    """
+    Report (once) whether any accounting API call got a 401 since the last check.
+    
+    Returns:
+        bool: True if a 401 was seen; the flag is cleared by this call
+    """
+    global _unauthorized
+    with _unauthorized_lock:
+        seen, _unauthorized = _unauthorized, False
+    return seen
+
+
+def _token_cache_key(client_id: str, scope: str) -> str:
+    """Build the cache key for a client/scope pair without storing the raw client ID."""
+    return hashlib.sha256(f"{client_id}:{scope}".encode()).hexdigest()
+
+
+def _read_token_cache() -> Dict[str, Any]:
+    """Read the whole token cache file, returning an empty dict if missing or unreadable."""
+    try:
+        with open(TOKEN_CACHE_PATH, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_cached_token(client_id: str, scope: str, min_lifetime: float = 0) -> Optional[Dict[str, Any]]:
+    """
+    Load a still-valid cached token for this client and scope.
+
+    Args:
+        client_id (str): Xero app client ID
+        scope (str): OAuth scope string the token was issued for
+        min_lifetime (float): Seconds the token must stay valid for beyond the expiry margin
+
+    Returns:
+        dict: {'access_token', 'tenant_id', 'expires_at'} if valid, None otherwise
+    """
+    entry = _read_token_cache().get(_token_cache_key(client_id, scope))
+    if not entry:
+        return None
+
+    if entry.get('expires_at', 0) <= time.time() + TOKEN_EXPIRY_MARGIN + min_lifetime:
+        return None
+
+    return entry
+
+
+def save_cached_token(client_id: str, scope: str, access_token: str,
+                      tenant_id: Optional[str], expires_in: int) -> None:
+    """
+    Store a freshly issued token in the cache file (owner read/write only).
+
+    Args:
+        client_id (str): Xero app client ID
+        scope (str): OAuth scope string the token was issued for
+        access_token (str): Bearer token
+        tenant_id (str): Tenant the token was resolved against
+        expires_in (int): Token lifetime in seconds as returned by Xero
+    """
+    try:
+        cache = _read_token_cache()
+        cache[_token_cache_key(client_id, scope)] = {
+            'access_token': access_token,
+            'tenant_id': tenant_id,
+            'expires_at': time.time() + expires_in
+        }
+        _write_token_cache(cache)
+
+    except Exception as e:
+        # Caching is an optimisation only; never fail authentication over it
+        print(f"Could not write token cache: {str(e)}")
+
+
+def _write_token_cache(cache: Dict[str, Any]) -> None:
+    """Replace the token cache file (owner read/write only)."""
+    os.makedirs(os.path.dirname(TOKEN_CACHE_PATH), mode=0o700, exist_ok=True)
+
+    # Write to a temp file and swap in so readers never see a partial file
+    tmp_path = f"{TOKEN_CACHE_PATH}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, TOKEN_CACHE_PATH)
+
+
+def parse_json(response: requests.Response) -> Any:
+    """Parse a JSON response body, using orjson when it is installed."""
+    return _loads(response.content)
+
+
+def _loads(content: bytes) -> Any:
+    """Parse raw JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def dump_json(payload: Any) -> bytes:
+    """Serialize a request body, using orjson when it is installed (send as data= with a JSON Content-Type)."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode()
+
+
+def with_idempotency_key(headers: Dict[str, str]) -> Dict[str, str]:
+    """
+    Copy headers and add a fresh Idempotency-Key for a create request.
+    
+    Xero replays the first response for a repeated key for 24 hours, so a POST
+    resent with the same headers (e.g. by the session's 429 retry) cannot
+    create the record twice. Use one key per logical request; a batched
+    Contacts POST needs only one.
+    
+    Args:
+        headers (dict): Request headers to extend
+        
+    Returns:
+        dict: New headers dict including Idempotency-Key
+    """
+    return {**headers, 'Idempotency-Key': str(uuid.uuid4())}
+
+
+def get_json(session: requests.Session, url: str, headers: Dict[str, str],
+             params: Optional[Dict[str, Any]] = None) -> Tuple[int, Any, str]:
+    """
+    GET a Xero endpoint, revalidating the last response with If-None-Match.
+    
+    When Xero answered a previous identical request with an ETag, that tag is
+    sent back and a 304 re-parses the cached body, so callers may mutate the
+    result freely. Responses without an ETag, or too large for the cache, are
+    simply not cached.
+    
+    Args:
+        session (requests.Session): Session to send the request on
+        url (str): Endpoint URL
+        headers (dict): Request headers (tenant header is part of the cache key)
+        params (dict): Optional query parameters
+        
+    Returns:
+        tuple: (status_code, parsed JSON body or None, response text on error)
+    """
+    key = (url, headers.get('Xero-Tenant-Id'), tuple(sorted((params or {}).items())))
+    
+    with _etag_cache_lock:
+        cached = _etag_cache.get(key)
+    
+    request_headers = headers
+    if cached:
+        request_headers = {**headers, 'If-None-Match': cached[0]}
+    
+    response = session.get(url, headers=request_headers, params=params)
+    
+    if response.status_code == 304 and cached:
+        with _etag_cache_lock:
+            if key in _etag_cache:
+                _etag_cache.move_to_end(key)
+        return 200, _loads(cached[1]), ''
+    
+    if response.status_code != 200:
+        return response.status_code, None, response.text
+    
+    content = response.content
+    data = _loads(content)
+    etag = response.headers.get('ETag')
+    
+    if etag and len(content) <= ETAG_CACHE_MAX_BYTES:
+        _store_etag(key, etag, content)
+    
+    return 200, data, ''
+
+
+def _store_etag(key: Tuple[Any, ...], etag: str, content: bytes) -> None:
+    """Cache a response body under its ETag, evicting least recently used entries past the limits."""
+    global _etag_cache_bytes
+    
+    with _etag_cache_lock:
+        previous = _etag_cache.pop(key, None)
+        if previous:
+            _etag_cache_bytes -= len(previous[1])
+        
+        _etag_cache[key] = (etag, content)
+        _etag_cache_bytes += len(content)
+        
+        while len(_etag_cache) > ETAG_CACHE_SIZE or _etag_cache_bytes > ETAG_CACHE_MAX_BYTES:
+            _, (_, evicted) = _etag_cache.popitem(last=False)
+            _etag_cache_bytes -= len(evicted)
+
+
+def _client_credentials(scope: str) -> Dict[str, Any]:
+    """
+    Get a token and tenant for the app in XERO_CLIENT_ID / XERO_CLIENT_SECRET.
+    
+    Served from the token cache while valid; otherwise runs the client
+    credentials grant plus the /connections lookup and caches the result.
+    
+    Raises:
+        RuntimeError: If credentials are missing or Xero rejects the request
+    """
+    client_id = os.getenv('XERO_CLIENT_ID')
+    client_secret = os.getenv('XERO_CLIENT_SECRET')
+    
+    if not client_id or not client_secret:
+        raise RuntimeError("XERO_CLIENT_ID and XERO_CLIENT_SECRET must be set")
+    
+    cached = load_cached_token(client_id, scope)
+    if cached and cached.get('tenant_id'):
+        return cached
+    
+    session = get_http_session()
+    
+    token_response = session.post(
+        TOKEN_URL,
+        data={'grant_type': 'client_credentials', 'scope': scope},
+        auth=(client_id, client_secret)
+    )
+    if token_response.status_code != 200:
+        raise RuntimeError(f"Token request failed: {token_response.status_code} - {token_response.text}")
+    
+    token_info = token_response.json()
+    access_token = token_info['access_token']
+    
+    connections_response = session.get(
+        CONNECTIONS_URL,
+        headers={'Authorization': f'Bearer {access_token}', 'Accept': 'application/json'}
+    )
+    if connections_response.status_code != 200 or not connections_response.json():
+        raise RuntimeError(f"No Xero connection found: {connections_response.status_code} - {connections_response.text}")
+    
+    tenant_id = connections_response.json()[0]['tenantId']
+    expires_in = token_info.get('expires_in', 1800)
+    save_cached_token(client_id, scope, access_token, tenant_id, expires_in)
+    
+    return {'access_token': access_token, 'tenant_id': tenant_id, 'expires_at': time.time() + expires_in}
+
+
+def get_access_token(scope: str = DEFAULT_SCOPE) -> str:
+    """
+    Get a valid access token, reusing the cached one when possible.
+    
+    Args:
+        scope (str): OAuth scope string
+        
+    Returns:
+        str: Bearer token
+    """
+    return _client_credentials(scope)['access_token']
+
+
+def get_tenant_id(scope: str = DEFAULT_SCOPE) -> str:
+    """
+    Get the tenant ID the cached token was issued against.
+    
+    Args:
+        scope (str): OAuth scope string
+        
+    Returns:
+        str: Xero tenant ID
+    """
+    return _client_credentials(scope)['tenant_id']
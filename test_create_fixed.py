@@ -1,84 +1,53 @@
 
-import os
-import sys
-import requests
-import base64
-from dotenv import load_dotenv
-
-# Add src directory to Python path
-sys.path.append('src')
 from constants import increment_account_sequence
-
-load_dotenv()
-
-client_id = os.getenv('XERO_CLIENT_ID')
-client_secret = os.getenv('XERO_CLIENT_SECRET')
-
-# Get access token
-credentials = base64.b64encode(f"{client_id}:{client_secret}".encode()).decode()
-token_response = requests.post(
-    'https://identity.xero.com/connect/token',
-    data={'grant_type': 'client_credentials', 'scope': 'accounting.contacts'},
-    headers={'Authorization': f'Basic {credentials}', 'Content-Type': 'application/x-www-form-urlencoded'}
-)
-
-access_token = token_response.json()['access_token']
-tenant_id = requests.get(
-    'https://api.xero.com/connections',
-    headers={'Authorization': f'Bearer {access_token}', 'Accept': 'application/json'}
-).json()[0]['tenantId']
-
-headers = {
-    'Authorization': f'Bearer {access_token}',
-    'Xero-Tenant-Id': tenant_id,
-    'Content-Type': 'application/json',
-    'Accept': 'application/json'
-}
-
-# Test 1: Create contact WITH email (should use primary contact fields)
-print("=== TEST 1: Contact with email ===")
-new_account = increment_account_sequence("WDS007142/2A")
-new_account_with_code = f"{new_account.split('/')[0]}/2A"
-
-test_contact_with_email = {
-    'Name': f'{new_account.split("/")[0]} - (3F2) 7 Westfield Street',
-    'AccountNumber': new_account_with_code,
-    'ContactStatus': 'ACTIVE',
-    'FirstName': 'New',
-    'LastName': 'Occupier', 
-    'EmailAddress': 'newtenant@example.com'
-}
-
-payload = {'Contacts': [test_contact_with_email]}
-create_response = requests.post('https://api.xero.com/api.xro/2.0/Contacts', headers=headers, json=payload)
-
-print(f"Status: {create_response.status_code}")
-if create_response.status_code == 200:
-    print("SUCCESS! Contact created with email.")
-else:
-    print(f"Error: {create_response.text[:500]}")
-
-print("\n" + "="*50)
-
-# Test 2: Create contact WITHOUT email (should work with just primary fields)
-print("=== TEST 2: Contact without email ===")
-new_account2 = increment_account_sequence(new_account_with_code)
-new_account_with_code2 = f"{new_account2.split('/')[0]}/2A"
-
-test_contact_no_email = {
-    'Name': f'{new_account2.split("/")[0]} - (3F2) 7 Westfield Street',
-    'AccountNumber': new_account_with_code2,
-    'ContactStatus': 'ACTIVE',
-    'FirstName': 'Another',
-    'LastName': 'Occupier'
-    # No EmailAddress
-}
-
-payload2 = {'Contacts': [test_contact_no_email]}
-create_response2 = requests.post('https://api.xero.com/api.xro/2.0/Contacts', headers=headers, json=payload2)
-
-print(f"Status: {create_response2.status_code}")
-if create_response2.status_code == 200:
-    print("SUCCESS! Contact created without email.")
-else:
-    print(f"Error: {create_response2.text[:500]}")
+from xero_api import dump_json, with_idempotency_key
+
+
+def test_create_contacts_with_and_without_email(xero_writes, xero_session, xero_headers):
+    """Primary contact fields work both with and without an email address."""
+    # Test 1: Create contact WITH email (should use primary contact fields)
+    new_account = increment_account_sequence("WDS007142/2A")
+    new_account_with_code = f"{new_account.split('/')[0]}/2A"
+
+    test_contact_with_email = {
+        'Name': f'{new_account.split("/")[0]} - (3F2) 7 Westfield Street',
+        'AccountNumber': new_account_with_code,
+        'ContactStatus': 'ACTIVE',
+        'FirstName': 'New',
+        'LastName': 'Occupier',
+        'EmailAddress': 'newtenant@example.com'
+    }
+
+    # Test 2: Create contact WITHOUT email (should work with just primary fields)
+    new_account2 = increment_account_sequence(new_account_with_code)
+    new_account_with_code2 = f"{new_account2.split('/')[0]}/2A"
+
+    test_contact_no_email = {
+        'Name': f'{new_account2.split("/")[0]} - (3F2) 7 Westfield Street',
+        'AccountNumber': new_account_with_code2,
+        'ContactStatus': 'ACTIVE',
+        'FirstName': 'Another',
+        'LastName': 'Occupier'
+        # No EmailAddress
+    }
+
+    # Both contacts go in one request; summarizeErrors=false returns a result per contact
+    response = xero_session.post(
+        'https://api.xero.com/api.xro/2.0/Contacts',
+        headers=with_idempotency_key(xero_headers),
+        params={'summarizeErrors': 'false'},
+        data=dump_json({'Contacts': [test_contact_with_email, test_contact_no_email]})
+    )
+
+    print(f"Status: {response.status_code}")
+    assert response.status_code == 200, response.text[:500]
+
+    labels = ["Contact with email", "Contact without email"]
+    contacts = response.json().get('Contacts', [])
+    assert len(contacts) == len(labels)
+
+    for label, contact in zip(labels, contacts):
+        errors = contact.get('ValidationErrors', [])
+        messages = '; '.join(e.get('Message', '') for e in errors)
+        assert contact.get('StatusAttributeString') != 'ERROR' and not errors, f"{label}: {messages[:500]}"
+        print(f"SUCCESS! {label} created: {contact.get('AccountNumber')}")
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from datetime import date
+
+import pytest
+
+import xero_api
+from invoice_manager import XeroInvoiceManager
+
+
+@pytest.fixture
+def manager(stub_session, monkeypatch):
+    """Invoice manager with a token already set, talking to the stub session."""
+    monkeypatch.setenv('XERO_CLIENT_ID', 'client')
+    monkeypatch.setenv('XERO_CLIENT_SECRET', 'secret')
+    monkeypatch.setattr(xero_api, '_etag_cache', OrderedDict())
+    monkeypatch.setattr(xero_api, '_etag_cache_bytes', 0)
+    return XeroInvoiceManager('token', 'tenant-1', session=stub_session)
+
+
+def _invoice(invoice_id, day):
+    return {'InvoiceID': invoice_id, 'DateString': f'{day}T00:00:00'}
+
+
+def test_reassign_batch_reports_failures(manager, stub_session):
+    """Invoices with validation errors, or missing from the reply, count as failed."""
+    stub_session.respond(200, {'Invoices': [
+        {'InvoiceID': 'a'},
+        {'InvoiceID': 'b', 'ValidationErrors': [{'Message': 'Invoice is paid'}]},
+        {'InvoiceID': 'c', 'StatusAttributeString': 'ERROR'},
+    ]})
+
+    successful, failed = manager.reassign_invoice_batch(['a', 'b', 'c', 'd'], 'new-contact')
+
+    assert successful == ['a']
+    assert failed == ['b', 'c', 'd']
+    assert stub_session.calls[0][2]['params'] == {'summarizeErrors': 'false'}
+
+
+def test_reassign_batch_fails_everything_on_error_status(manager, stub_session):
+    """A non-200 reply fails the whole batch."""
+    stub_session.respond(429, {'Message': 'rate limited'})
+
+    assert manager.reassign_invoice_batch(['a', 'b'], 'new-contact') == ([], ['a', 'b'])
+
+
+def test_invoice_pages_stop_at_short_page(manager, stub_session):
+    """Paging stops after the first page shorter than pagesize."""
+    stub_session.respond(200, {'Invoices': [_invoice('a', '2024-06-01'), _invoice('b', '2024-05-20')]})
+    stub_session.respond(200, {'Invoices': [_invoice('c', '2024-05-10')]})
+
+    pages = list(manager.iter_invoice_pages('contact', date(2024, 1, 1), pagesize=2))
+
+    assert [[inv['InvoiceID'] for inv in page] for page in pages] == [['a', 'b'], ['c']]
+    assert [call[2]['params']['page'] for call in stub_session.calls] == [1, 2]
+
+
+def test_invoice_pages_stop_before_move_in_date(manager, stub_session):
+    """A full page reaching back past the move-in date is the last one fetched."""
+    stub_session.respond(200, {'Invoices': [_invoice('a', '2024-06-01'), _invoice('b', '2024-04-01')]})
+
+    pages = list(manager.iter_invoice_pages('contact', date(2024, 5, 1), pagesize=2))
+
+    assert len(pages) == 1
+    assert len(stub_session.calls) == 1
+
+
+def test_invoice_pages_raise_on_error(manager, stub_session):
+    """A failed page raises rather than looking like the end of the list."""
+    stub_session.respond(401, {'Title': 'Unauthorized'})
+
+    with pytest.raises(RuntimeError, match='401'):
+        list(manager.iter_invoice_pages('contact', date(2024, 5, 1)))
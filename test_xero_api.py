@@ -0,0 +1,146 @@
+from collections import OrderedDict
+
+import pytest
+from urllib3.response import HTTPResponse
+
+import xero_api
+
+
+@pytest.fixture
+def token_cache_path(tmp_path, monkeypatch):
+    """Point the token cache at a throwaway file."""
+    path = tmp_path / 'xero' / 'token.json'
+    monkeypatch.setattr(xero_api, 'TOKEN_CACHE_PATH', str(path))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def empty_etag_cache(monkeypatch):
+    """Give every test its own empty ETag cache."""
+    monkeypatch.setattr(xero_api, '_etag_cache', OrderedDict())
+    monkeypatch.setattr(xero_api, '_etag_cache_bytes', 0)
+
+
+def test_token_cache_round_trip(token_cache_path):
+    """A saved token loads back for the same client and scope, from an owner-only file."""
+    xero_api.save_cached_token('client', 'scope', 'token-1', 'tenant-1', expires_in=1800)
+
+    entry = xero_api.load_cached_token('client', 'scope')
+    assert entry['access_token'] == 'token-1'
+    assert entry['tenant_id'] == 'tenant-1'
+    assert token_cache_path.stat().st_mode & 0o777 == 0o600
+    assert xero_api.load_cached_token('client', 'other scope') is None
+    assert xero_api.load_cached_token('other client', 'scope') is None
+
+
+def test_token_cache_expiry_margin(token_cache_path):
+    """Tokens inside the expiry margin, or short of min_lifetime, are not returned."""
+    xero_api.save_cached_token('client', 'scope', 'nearly-expired', None,
+                               expires_in=xero_api.TOKEN_EXPIRY_MARGIN - 1)
+    assert xero_api.load_cached_token('client', 'scope') is None
+
+    xero_api.save_cached_token('client', 'scope', 'fresh', None,
+                               expires_in=xero_api.TOKEN_EXPIRY_MARGIN + 60)
+    assert xero_api.load_cached_token('client', 'scope')['access_token'] == 'fresh'
+    assert xero_api.load_cached_token('client', 'scope', min_lifetime=120) is None
+
+
+def test_token_cache_ignores_corrupt_file(token_cache_path):
+    """An unreadable cache file is treated as empty and replaced on the next save."""
+    token_cache_path.parent.mkdir(parents=True)
+    token_cache_path.write_text('{not json')
+    assert xero_api.load_cached_token('client', 'scope') is None
+
+    xero_api.save_cached_token('client', 'scope', 'token-1', None, expires_in=1800)
+    assert xero_api.load_cached_token('client', 'scope')['access_token'] == 'token-1'
+
+
+def test_get_json_revalidates_with_etag(stub_session):
+    """A 304 answers from the cache, and each caller gets its own copy of the body."""
+    url = 'https://api.xero.com/api.xro/2.0/Contacts'
+    headers = {'Xero-Tenant-Id': 'tenant-1'}
+    stub_session.respond(200, {'Contacts': [{'Name': 'A'}]}, {'ETag': '"v1"'})
+    stub_session.respond(304)
+
+    status, first, _ = xero_api.get_json(stub_session, url, headers, {'page': 1})
+    assert status == 200
+    first['Contacts'].clear()
+
+    status, second, _ = xero_api.get_json(stub_session, url, headers, {'page': 1})
+    assert status == 200
+    assert second == {'Contacts': [{'Name': 'A'}]}
+    assert 'If-None-Match' not in stub_session.calls[0][2]['headers']
+    assert stub_session.calls[1][2]['headers']['If-None-Match'] == '"v1"'
+
+
+def test_get_json_without_etag_is_not_cached(stub_session):
+    """Responses without an ETag are fetched in full every time."""
+    url = 'https://api.xero.com/api.xro/2.0/Contacts'
+    stub_session.respond(200, {'Contacts': []})
+    stub_session.respond(500, {'Message': 'boom'})
+
+    assert xero_api.get_json(stub_session, url, {})[0] == 200
+    status, data, error_text = xero_api.get_json(stub_session, url, {})
+    assert 'If-None-Match' not in stub_session.calls[1][2]['headers']
+    assert (status, data) == (500, None)
+    assert 'boom' in error_text
+
+
+def test_etag_cache_is_bounded(stub_session, monkeypatch):
+    """Least recently used bodies are evicted once the byte budget is exceeded."""
+    monkeypatch.setattr(xero_api, 'ETAG_CACHE_MAX_BYTES', 40)
+    url = 'https://api.xero.com/api.xro/2.0/Invoices'
+    for page in (1, 2):
+        stub_session.respond(200, {'Invoices': ['x' * 10]}, {'ETag': f'"p{page}"'})
+        xero_api.get_json(stub_session, url, {}, {'page': page})
+
+    assert [key[2] for key in xero_api._etag_cache] == [(('page', 2),)]
+    assert xero_api._etag_cache_bytes == len(xero_api._etag_cache[(url, None, (('page', 2),))][1])
+
+
+def test_retry_after_is_clamped():
+    """Retry-After is honoured but never above RETRY_AFTER_MAX (or below a second)."""
+    retry = xero_api._ClampedRetry(total=3, status_forcelist=[429, 502])
+
+    def wait_for(value):
+        return retry.get_retry_after(HTTPResponse(status=429, headers={'Retry-After': value}))
+
+    assert wait_for('3600') == xero_api.RETRY_AFTER_MAX
+    assert wait_for('5') == 5
+    assert wait_for('0') == 1
+    assert retry.get_retry_after(HTTPResponse(status=429)) is None
+
+
+def test_posts_retry_only_on_429():
+    """POSTs are retried when Xero refuses them with a 429, not after a gateway error."""
+    retry = xero_api._ClampedRetry(total=3, status_forcelist=[429, 502])
+
+    assert retry.is_retry('POST', 429)
+    assert not retry.is_retry('POST', 502)
+    assert retry.is_retry('GET', 502)
+    assert not retry.is_retry('GET', 400)
+
+
+def test_rate_limit_hook_pauses_near_minute_limit(stub_response, monkeypatch):
+    """The response hook sleeps only once X-MinLimit-Remaining drops below the floor."""
+    sleeps = []
+    monkeypatch.setattr(xero_api.time, 'sleep', sleeps.append)
+
+    xero_api._respect_rate_limits(stub_response(200, headers={'X-MinLimit-Remaining': '40'}))
+    xero_api._respect_rate_limits(stub_response(200))
+    assert sleeps == []
+
+    xero_api._respect_rate_limits(stub_response(200, headers={'X-MinLimit-Remaining': '1'}))
+    assert sleeps == [xero_api.MIN_LIMIT_PAUSE]
+
+
+def test_unauthorized_flag_is_taken_once(stub_response):
+    """A 401 from the accounting API is reported by the next take_unauthorized() only."""
+    xero_api.take_unauthorized()
+
+    xero_api._note_unauthorized(stub_response(401, url='https://identity.xero.com/connect/token'))
+    assert not xero_api.take_unauthorized()
+
+    xero_api._note_unauthorized(stub_response(401))
+    assert xero_api.take_unauthorized()
+    assert not xero_api.take_unauthorized()